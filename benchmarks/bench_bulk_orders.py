@@ -0,0 +1,64 @@
+"""
+Benchmark order ingestion: looping POST /orders versus one POST /orders/bulk.
+
+Usage: python benchmarks/bench_bulk_orders.py [orders] [items_per_order]
+"""
+
+import asyncio
+import sys
+import time
+
+from common import open_database, report
+from models import OrderCreate
+from routes.orders import create_order, create_orders_bulk
+
+async def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    items_per_order = int(sys.argv[2]) if len(sys.argv) > 2 else 3
+    
+    db, counter = await open_database()
+    await db.products.insert_many([
+        {
+            "_id": f"product_{i}",
+            "name": f"Product {i}",
+            "price": 100.0 + i,
+            "sizes": [{"size": "M", "quantity": 10 ** 9}],
+        }
+        for i in range(50)
+    ])
+    orders = [
+        OrderCreate(
+            userId=f"user_{o % 100}",
+            items=[
+                {"productId": f"product_{(o + i) % 50}", "size": "M", "qty": 1}
+                for i in range(items_per_order)
+            ],
+        )
+        for o in range(count)
+    ]
+    
+    results = []
+    for label, run in (
+        ("single_endpoint_loop", lambda: _loop_single(orders)),
+        ("bulk_endpoint", lambda: create_orders_bulk(orders=orders)),
+    ):
+        counter.count = 0
+        start = time.perf_counter()
+        await run()
+        elapsed = time.perf_counter() - start
+        results.append({
+            "label": label,
+            "orders": count,
+            "round_trips": counter.count,
+            "seconds": round(elapsed, 3),
+            "orders_per_sec": round(count / elapsed, 1),
+        })
+    
+    report("bulk_orders", results)
+
+async def _loop_single(orders):
+    for order in orders:
+        await create_order(order, idempotency_key=None)
+
+if __name__ == "__main__":
+    asyncio.run(main())
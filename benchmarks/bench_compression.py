@@ -0,0 +1,82 @@
+"""
+Benchmark response compression: bytes on the wire and latency per encoding.
+
+Requests a page of products and the web interface through the ASGI app
+with Accept-Encoding identity, gzip and br (br needs pip install brotli),
+first with the web interface compressed per request and then served from
+the .gz/.br copies written by precompress_directory (pip install httpx).
+Precompressed copies are removed again afterwards.
+
+Usage: python benchmarks/bench_compression.py [iterations] [page_size]
+"""
+
+import asyncio
+import glob
+import os
+import sys
+import time
+
+from common import percentile, report
+from storage import set_storage
+from storage.memory import MemoryStorage
+from utils.compression import brotli, precompress_directory
+
+STATIC_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "static")
+ENCODINGS = ["identity", "gzip"] + (["br"] if brotli is not None else [])
+
+async def seed(storage: MemoryStorage, count: int):
+    for i in range(count):
+        await storage.products.insert({
+            "_id": f"product_{i}", "name": f"Cotton Shirt {i}", "nameLower": f"cotton shirt {i}",
+            "price": 499.0 + i, "sizes": [{"size": size, "quantity": 10} for size in ("S", "M", "L", "XL")],
+        })
+
+async def measure_encoding(client, label: str, path: str, encoding: str, iterations: int) -> dict:
+    """Time GET path and record the encoded body size"""
+    samples = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        async with client.stream("GET", path, headers={"Accept-Encoding": encoding}) as response:
+            response.raise_for_status()
+            body = b"".join([chunk async for chunk in response.aiter_raw()])
+        samples.append((time.perf_counter() - start) * 1000)
+    return {
+        "label": f"{label}_{encoding}",
+        "content_encoding": response.headers.get("content-encoding", "identity"),
+        "bytes": len(body),
+        "p50_ms": round(percentile(samples, 50), 3),
+        "p99_ms": round(percentile(samples, 99), 3),
+    }
+
+async def main():
+    iterations = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    page_size = int(sys.argv[2]) if len(sys.argv) > 2 else 100
+
+    import httpx
+    from main import app
+
+    storage = MemoryStorage()
+    await seed(storage, page_size)
+    set_storage(storage)
+
+    results = []
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        for encoding in ENCODINGS:
+            results.append(await measure_encoding(client, "products_page", f"/products?limit={page_size}", encoding, iterations))
+        for encoding in ENCODINGS:
+            results.append(await measure_encoding(client, "index_on_the_fly", "/", encoding, iterations))
+
+        precompress_directory(STATIC_DIR)
+        try:
+            for encoding in ENCODINGS:
+                results.append(await measure_encoding(client, "index_precompressed", "/", encoding, iterations))
+        finally:
+            for pattern in ("*.gz", "*.br"):
+                for path in glob.glob(os.path.join(STATIC_DIR, "**", pattern), recursive=True):
+                    os.remove(path)
+
+    report("compression", results, config={"iterations": iterations, "page_size": page_size, "encodings": ENCODINGS})
+
+if __name__ == "__main__":
+    asyncio.run(main())
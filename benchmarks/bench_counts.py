@@ -0,0 +1,43 @@
+"""
+Benchmark GET /products count modes: no total, exact counts and fast counts.
+
+Fast totals use estimated_document_count without filters and the count
+cache with them; the first fast call per filter pays for one real count.
+
+Usage: python benchmarks/bench_counts.py [products] [iterations]
+"""
+
+import asyncio
+import sys
+
+from bench_search import seed
+from common import open_database, measure, report
+from routes.products import _find_products
+
+FILTERS = {
+    "unfiltered": dict(name=None, match=None, size=None, in_stock=False),
+    "contains": dict(name="phone", match="contains", size=None, in_stock=False),
+    "size_in_stock": dict(name=None, match=None, size="M", in_stock=True),
+}
+
+async def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    iterations = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+
+    db, counter = await open_database()
+    await seed(db, count)
+
+    results = []
+    for label, filters in FILTERS.items():
+        for count_mode in (None, "exact", "fast"):
+            results.append(await measure(
+                f"{label}:{count_mode or 'none'}",
+                lambda: _find_products(**filters, limit=10, offset=0, after=None, before=None, count=count_mode),
+                iterations,
+                counter,
+            ))
+
+    report("counts", results)
+
+if __name__ == "__main__":
+    asyncio.run(main())
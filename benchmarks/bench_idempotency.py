@@ -0,0 +1,122 @@
+"""
+Benchmark POST /orders with Idempotency-Key under bursts of parallel retries.
+
+Each burst sends the same order with the same key many times at once and
+checks that exactly one order was placed and stock was taken once. The
+"two_workers" burst splits the retries between two coordinators sharing
+the storage backend, as separate uvicorn workers would, so they coalesce
+through the idempotency collection. Replays are then timed against fresh
+orders (pip install httpx).
+
+Usage: python benchmarks/bench_idempotency.py [--backend memory|mongo] [--burst N] [--iterations N]
+"""
+
+import argparse
+import asyncio
+import time
+import uuid
+
+from common import open_database, percentile, report
+from database import create_indexes
+from models import OrderCreate
+from storage import get_storage, set_storage
+from storage.memory import MemoryStorage
+
+PRODUCT_ID = "bench_product"
+USER_ID = "bench_user"
+ORDER = {"userId": USER_ID, "items": [{"productId": PRODUCT_ID, "size": "M", "qty": 1}]}
+
+async def stock() -> int:
+    async for product in get_storage().products.export():
+        if product["_id"] == PRODUCT_ID:
+            return product["sizes"][0]["quantity"]
+
+async def check_burst(label: str, send, burst: int) -> dict:
+    """Fire `burst` identical requests at once and check one order resulted"""
+    orders_before = await get_storage().orders.count_by_user(USER_ID)
+    stock_before = await stock()
+
+    start = time.perf_counter()
+    responses = await asyncio.gather(*(send(i) for i in range(burst)))
+    elapsed = time.perf_counter() - start
+
+    order_ids = {order_id for order_id, _ in responses}
+    orders_placed = await get_storage().orders.count_by_user(USER_ID) - orders_before
+    stock_taken = stock_before - await stock()
+    return {
+        "label": label,
+        "requests": burst,
+        "orders_placed": orders_placed,
+        "stock_taken": stock_taken,
+        "distinct_ids": len(order_ids),
+        "replayed": sum(1 for _, replayed in responses if replayed),
+        "ok": orders_placed == 1 and stock_taken == 1 and len(order_ids) == 1,
+        "seconds": round(elapsed, 4),
+    }
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--backend", choices=["memory", "mongo"], default="memory")
+    parser.add_argument("--burst", type=int, default=50)
+    parser.add_argument("--iterations", type=int, default=200)
+    args = parser.parse_args()
+
+    import httpx
+    from main import app
+    from routes.orders import _place_order
+    from utils.idempotency import IdempotentRequests, request_fingerprint
+
+    if args.backend == "memory":
+        set_storage(MemoryStorage())
+    else:
+        await open_database()
+        await create_indexes()
+    await get_storage().products.insert({
+        "_id": PRODUCT_ID, "name": "Bench Product", "nameLower": "bench product",
+        "price": 100.0, "sizes": [{"size": "M", "quantity": 1_000_000}],
+    })
+
+    results = []
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        async def post(key: str):
+            response = await client.post("/orders", json=ORDER, headers={"Idempotency-Key": key})
+            response.raise_for_status()
+            return response.json()["id"], response.headers.get("Idempotent-Replayed") == "true"
+
+        key = str(uuid.uuid4())
+        results.append(await check_burst("one_worker", lambda i: post(key), args.burst))
+
+        # Two coordinators share only the storage backend
+        workers = [IdempotentRequests(), IdempotentRequests()]
+        order = OrderCreate(**ORDER)
+        fingerprint = request_fingerprint(order.model_dump())
+        key = str(uuid.uuid4())
+
+        async def send(i: int):
+            response = await workers[i % 2].run(key, fingerprint, lambda: _place_order(order), status_code=201)
+            return response.body["id"], response.replayed
+
+        results.append(await check_burst("two_workers", send, args.burst))
+
+        # Latency of replays against placing new orders
+        replay_key = str(uuid.uuid4())
+        await post(replay_key)
+        for label, next_key in (("new_order", lambda: str(uuid.uuid4())), ("replay", lambda: replay_key)):
+            samples = []
+            for _ in range(args.iterations):
+                request_key = next_key()
+                start = time.perf_counter()
+                await post(request_key)
+                samples.append((time.perf_counter() - start) * 1000)
+            results.append({
+                "label": label,
+                "iterations": args.iterations,
+                "p50_ms": round(percentile(samples, 50), 3),
+                "p99_ms": round(percentile(samples, 99), 3),
+            })
+
+    report("idempotency", results, config=vars(args))
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,83 @@
+"""
+Benchmark POST /products/import throughput for NDJSON and CSV uploads.
+
+Streams generated catalogue feeds through the ASGI app in 64 KB chunks
+(pip install httpx): a first pass inserts every SKU, a second updates
+them. The mongo backend needs MONGODB_URL, because the mongomock stand-in
+does not support bulk_write upserts.
+
+Usage: python benchmarks/bench_import.py [--backend memory|mongo] [--rows N]
+"""
+
+import argparse
+import asyncio
+import json
+import time
+
+from common import open_database, report
+from storage import set_storage
+from storage.memory import MemoryStorage
+
+CHUNK_SIZE = 64 * 1024
+
+def ndjson_feed(rows: int, version: int) -> bytes:
+    return b"".join(
+        json.dumps({
+            "sku": f"SKU-{i:08d}",
+            "name": f"Product {i} v{version}",
+            "price": 100.0 + i,
+            "sizes": [{"size": "M", "quantity": 10}, {"size": "L", "quantity": 5}],
+        }).encode() + b"\n"
+        for i in range(rows)
+    )
+
+def csv_feed(rows: int, version: int) -> bytes:
+    lines = ["sku,name,price,sizes"]
+    lines.extend(f"SKU-{i:08d},Product {i} v{version},{100.0 + i},M:10;L:5" for i in range(rows))
+    return ("\n".join(lines) + "\n").encode()
+
+async def chunked(body: bytes):
+    for start in range(0, len(body), CHUNK_SIZE):
+        yield body[start:start + CHUNK_SIZE]
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--backend", choices=["memory", "mongo"], default="memory")
+    parser.add_argument("--rows", type=int, default=100000)
+    args = parser.parse_args()
+
+    import httpx
+    from main import app
+
+    results = []
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+        for import_format, feed in (("ndjson", ndjson_feed), ("csv", csv_feed)):
+            # Fresh storage per format so the first pass always inserts
+            if args.backend == "memory":
+                set_storage(MemoryStorage())
+            else:
+                db, _ = await open_database()
+                await db.products.create_index("sku", unique=True, sparse=True)
+
+            for version, label in ((1, "insert"), (2, "update")):
+                body = feed(args.rows, version)
+                start = time.perf_counter()
+                response = await client.post(f"/products/import?format={import_format}", content=chunked(body))
+                elapsed = time.perf_counter() - start
+                summary = response.json()
+                results.append({
+                    "label": f"{import_format}_{label}",
+                    "rows": args.rows,
+                    "megabytes": round(len(body) / 2 ** 20, 1),
+                    "inserted": summary.get("inserted"),
+                    "updated": summary.get("updated"),
+                    "failed": summary.get("failed"),
+                    "seconds": round(elapsed, 3),
+                    "rows_per_sec": round(args.rows / elapsed),
+                })
+
+    report("product_import", results, config=vars(args))
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,75 @@
+"""
+Benchmark GET /orders/{user_id}: per-item find_one, one $in query per page
+(orders without line snapshots, cold product cache) and line snapshots.
+
+Usage: python benchmarks/bench_order_history.py [orders] [items_per_order] [iterations]
+"""
+
+import asyncio
+import sys
+
+from common import open_database, measure, report
+from routes.orders import get_user_orders
+from utils.product_cache import product_cache
+
+USER_ID = "bench_user"
+SNAPSHOT_USER_ID = "bench_snapshot_user"
+
+async def seed(db, orders: int, items_per_order: int):
+    """Insert products and one heavy user's order history"""
+    products = [
+        {"_id": f"product_{i}", "name": f"Product {i}", "price": 100.0 + i, "sizes": []}
+        for i in range(items_per_order * 5)
+    ]
+    await db.products.insert_many(products)
+    
+    for user_id, snapshot in ((USER_ID, False), (SNAPSHOT_USER_ID, True)):
+        await db.orders.insert_many([
+            {
+                "userId": user_id,
+                "items": [
+                    _order_line(products[(o + i) % len(products)], snapshot)
+                    for i in range(items_per_order)
+                ],
+                "total": 0.0,
+            }
+            for o in range(orders)
+        ])
+
+def _order_line(product: dict, snapshot: bool) -> dict:
+    line = {"productId": product["_id"], "size": "M", "qty": 1}
+    if snapshot:
+        line.update(name=product["name"], unitPrice=product["price"])
+    return line
+
+async def per_item_lookup(db, limit: int):
+    """Previous implementation: one find_one per order item"""
+    orders = await db.orders.find({"userId": USER_ID}).to_list(length=None)
+    for order in orders[:limit]:
+        for item in order["items"]:
+            await db.products.find_one({"_id": item["productId"]})
+
+async def _cold_cache_page(user_id: str):
+    """Fetch a 100-order page with an empty product cache"""
+    product_cache.clear()
+    await get_user_orders(
+        user_id=user_id, limit=100, offset=0, include_total=False, after=None, before=None
+    )
+
+async def main():
+    orders = int(sys.argv[1]) if len(sys.argv) > 1 else 100
+    items_per_order = int(sys.argv[2]) if len(sys.argv) > 2 else 10
+    iterations = int(sys.argv[3]) if len(sys.argv) > 3 else 50
+    
+    db, counter = await open_database()
+    await seed(db, orders, items_per_order)
+    
+    results = [
+        await measure("per_item_find_one", lambda: per_item_lookup(db, 100), iterations, counter),
+        await measure("batched_in_query", lambda: _cold_cache_page(USER_ID), iterations, counter),
+        await measure("line_snapshots", lambda: _cold_cache_page(SNAPSHOT_USER_ID), iterations, counter),
+    ]
+    report("order_history", results)
+
+if __name__ == "__main__":
+    asyncio.run(main())
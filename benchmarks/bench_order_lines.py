@@ -0,0 +1,84 @@
+"""
+Benchmark POST /orders latency for 1-, 10- and 50-line orders.
+
+Every product storage call sleeps for a simulated round-trip time, as
+against Atlas, so the effect of reserving an order's lines one at a time
+versus ORDER_LINE_CONCURRENCY at once is visible. The product cache is
+cleared before each order, so the product lookup is included as well.
+
+Usage: python benchmarks/bench_order_lines.py [iterations] [rtt_ms]
+"""
+
+import asyncio
+import sys
+
+from common import measure, report, RoundTripCounter
+from models import OrderCreate
+from storage import get_storage, set_storage
+from storage.memory import MemoryStorage
+import routes.orders
+from routes.orders import create_order
+from utils.product_cache import product_cache
+
+LINE_COUNTS = [1, 10, 50]
+PRODUCTS = 50
+
+class _DelayedProducts:
+    """Product repository proxy that adds a round trip to every storage call"""
+
+    def __init__(self, products, rtt: float, counter: RoundTripCounter):
+        self._products = products
+        self._rtt = rtt
+        self._counter = counter
+
+    def __getattr__(self, name):
+        attr = getattr(self._products, name)
+
+        async def delayed(*args, **kwargs):
+            self._counter.count += 1
+            await asyncio.sleep(self._rtt)
+            return await attr(*args, **kwargs)
+
+        return delayed
+
+def order_with_lines(lines: int) -> OrderCreate:
+    return OrderCreate(
+        userId="bench_user",
+        items=[{"productId": f"product_{i % PRODUCTS}", "size": "M", "qty": 1} for i in range(lines)],
+    )
+
+async def main():
+    iterations = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+    rtt_ms = float(sys.argv[2]) if len(sys.argv) > 2 else 2.0
+
+    storage = MemoryStorage()
+    for i in range(PRODUCTS):
+        await storage.products.insert({
+            "_id": f"product_{i}", "name": f"Product {i}", "nameLower": f"product {i}",
+            "price": 99.99, "sizes": [{"size": "M", "quantity": 10 ** 9}],
+        })
+    counter = RoundTripCounter()
+    storage.products = _DelayedProducts(storage.products, rtt_ms / 1000, counter)
+    set_storage(storage)
+
+    async def place(order: OrderCreate):
+        product_cache.clear()
+        await create_order(order, idempotency_key=None)
+
+    results = []
+    for concurrency in (1, routes.orders.ORDER_LINE_CONCURRENCY):
+        routes.orders.ORDER_LINE_CONCURRENCY = concurrency
+        for lines in LINE_COUNTS:
+            order = order_with_lines(lines)
+            result = await measure(f"{lines}_lines_concurrency_{concurrency}", lambda: place(order), iterations, counter)
+            results.append(result)
+
+    # A total that float accumulation gets wrong: 50 x 99.99 = 4999.5
+    response = await create_order(order_with_lines(50), idempotency_key=None)
+    orders = await get_storage().orders.find_by_user("bench_user", 1, descending=True)
+    results.append({"label": "total_50_lines_99.99", "total": orders[0]["total"], "order_id": response.id})
+
+    report("order_lines", results, config={"iterations": iterations, "rtt_ms": rtt_ms})
+
+if __name__ == "__main__":
+    asyncio.run(main())
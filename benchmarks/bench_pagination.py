@@ -0,0 +1,69 @@
+"""
+Benchmark deep pages of GET /products and GET /orders/{user_id}: offset vs cursor mode.
+
+Usage: python benchmarks/bench_pagination.py [page] [page_size] [iterations]
+"""
+
+import asyncio
+import sys
+
+from common import open_database, measure, report
+from routes.orders import get_user_orders
+from routes.products import list_products
+from utils.pagination import encode_cursor
+
+USER_ID = "bench_user"
+
+async def seed(db, count: int):
+    """Insert `count` products and `count` orders for one user"""
+    await db.products.insert_many([
+        {"_id": f"product_{i:08d}", "name": f"Product {i}", "price": 100.0, "sizes": []}
+        for i in range(count)
+    ])
+    await db.orders.insert_many([
+        {"_id": f"order_{i:08d}", "userId": USER_ID, "items": [], "total": 0.0}
+        for i in range(count)
+    ])
+
+async def main():
+    page = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    page_size = int(sys.argv[2]) if len(sys.argv) > 2 else 10
+    iterations = int(sys.argv[3]) if len(sys.argv) > 3 else 20
+    
+    offset = (page - 1) * page_size
+    db, counter = await open_database()
+    await seed(db, offset + page_size)
+    
+    # Cursors for the same page: the _id of the last document on the page before
+    product_cursor = encode_cursor(f"product_{offset - 1:08d}")
+    order_cursor = encode_cursor(f"order_{offset - 1:08d}")
+    
+    common_products = dict(name=None, match=None, size=None, in_stock=False, limit=page_size, before=None, count=None, if_none_match=None)
+    common_orders = dict(user_id=USER_ID, limit=page_size, include_total=False, before=None)
+    
+    results = [
+        await measure(
+            f"products_offset_page_{page}",
+            lambda: list_products(offset=offset, after=None, **common_products),
+            iterations, counter,
+        ),
+        await measure(
+            f"products_cursor_page_{page}",
+            lambda: list_products(offset=0, after=product_cursor, **common_products),
+            iterations, counter,
+        ),
+        await measure(
+            f"orders_offset_page_{page}",
+            lambda: get_user_orders(offset=offset, after=None, **common_orders),
+            iterations, counter,
+        ),
+        await measure(
+            f"orders_cursor_page_{page}",
+            lambda: get_user_orders(offset=0, after=order_cursor, **common_orders),
+            iterations, counter,
+        ),
+    ]
+    report("pagination", results)
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,58 @@
+"""
+Benchmark product name search modes over a large seeded catalogue.
+
+Usage: python benchmarks/bench_search.py [products] [iterations]
+"""
+
+import asyncio
+import random
+import sys
+
+from common import open_database, measure, report
+from database import create_indexes
+from routes.products import _find_products
+
+BRANDS = ["Apple", "Samsung", "Nike", "Adidas", "Sony", "Puma", "Levis", "Zara", "Boat", "Lenovo"]
+ITEMS = ["Phone", "Shoe", "Jacket", "Headphones", "Watch", "Laptop", "Shirt", "Jeans", "Bag", "Cap"]
+BATCH_SIZE = 10000
+
+async def seed(db, count: int):
+    """Insert `count` products with realistic names and indexes"""
+    rng = random.Random(42)
+    for start in range(0, count, BATCH_SIZE):
+        batch = []
+        for i in range(start, min(count, start + BATCH_SIZE)):
+            name = f"{rng.choice(BRANDS)} {rng.choice(ITEMS)} {i}"
+            batch.append({
+                "name": name,
+                "nameLower": name.lower(),
+                "price": float(rng.randint(100, 100000)),
+                "sizes": [{"size": "M", "quantity": rng.randint(0, 20)}],
+            })
+        await db.products.insert_many(batch)
+    await create_indexes()
+
+async def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    iterations = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+    
+    db, counter = await open_database()
+    await seed(db, count)
+    
+    results = []
+    for match, name in (("contains", "apple"), ("prefix", "apple"), ("text", "apple phone")):
+        try:
+            results.append(await measure(
+                f"{match}:{name}",
+                lambda: _find_products(name, match, None, False, 10, 0, None, None),
+                iterations,
+                counter,
+            ))
+        except NotImplementedError as e:
+            # The mongomock stand-in has no $text support
+            results.append({"label": f"{match}:{name}", "error": str(e)})
+    
+    report("search", results)
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,146 @@
+"""
+Benchmark response serialization CPU time for 100-item product and order pages.
+
+Compares the previous path (Pydantic response objects built one by one,
+re-validated through response_model and rendered by JSONResponse) with
+plain dicts serialized once by orjson, then measures whole requests
+through the ASGI app on the in-memory backend (pip install httpx).
+
+Usage: python benchmarks/bench_serialization.py [iterations] [page_size]
+"""
+
+import asyncio
+import sys
+import time
+
+from fastapi.responses import JSONResponse
+from fastapi.routing import serialize_response
+from fastapi.utils import create_model_field
+import orjson
+
+from common import report
+from models import (
+    OrderItemResponse, OrderListResponse, OrderResponse, PaginationMetadata,
+    ProductDetails, ProductListResponse, ProductResponse
+)
+from storage import set_storage
+from storage.memory import MemoryStorage
+
+def product_rows(count: int) -> list:
+    return [{"_id": f"product_{i}", "name": f"Product {i}", "price": 100.0 + i} for i in range(count)]
+
+def order_rows(count: int) -> list:
+    return [
+        {
+            "_id": f"order_{o}",
+            "items": [
+                {"productId": f"product_{o + i}", "name": f"Product {o + i}", "qty": 1}
+                for i in range(3)
+            ],
+            "total": 300.0 + o,
+        }
+        for o in range(count)
+    ]
+
+def products_pydantic(rows: list, page: PaginationMetadata) -> bytes:
+    return ProductListResponse(
+        data=[ProductResponse(id=str(row["_id"]), name=row["name"], price=row["price"]) for row in rows],
+        page=page
+    ).model_dump_json().encode()
+
+def products_orjson(rows: list, page: PaginationMetadata) -> bytes:
+    return orjson.dumps({
+        "data": [{"id": str(row["_id"]), "name": row["name"], "price": row["price"]} for row in rows],
+        "page": page.model_dump()
+    })
+
+ORDER_LIST_FIELD = create_model_field("Response", OrderListResponse, mode="serialization")
+
+async def orders_pydantic(rows: list, page: PaginationMetadata) -> bytes:
+    response = OrderListResponse(
+        data=[
+            OrderResponse(
+                id=str(row["_id"]),
+                items=[
+                    OrderItemResponse(productDetails=ProductDetails(name=item["name"], id=item["productId"]), qty=item["qty"])
+                    for item in row["items"]
+                ],
+                total=row["total"]
+            )
+            for row in rows
+        ],
+        page=page
+    )
+    content = await serialize_response(field=ORDER_LIST_FIELD, response_content=response)
+    return JSONResponse(content).body
+
+async def orders_orjson(rows: list, page: PaginationMetadata) -> bytes:
+    return orjson.dumps({
+        "data": [
+            {
+                "id": str(row["_id"]),
+                "items": [
+                    {"productDetails": {"name": item["name"], "id": item["productId"]}, "qty": item["qty"]}
+                    for item in row["items"]
+                ],
+                "total": row["total"],
+            }
+            for row in rows
+        ],
+        "page": page.model_dump()
+    })
+
+async def cpu_per_call(label: str, func, iterations: int) -> dict:
+    """Average process CPU time of awaiting func()"""
+    await func()
+    start = time.process_time()
+    for _ in range(iterations):
+        await func()
+    cpu = time.process_time() - start
+    return {"label": label, "iterations": iterations, "cpu_us_per_call": round(cpu / iterations * 1e6, 1)}
+
+async def main():
+    iterations = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    page_size = int(sys.argv[2]) if len(sys.argv) > 2 else 100
+
+    products = product_rows(page_size)
+    orders = order_rows(page_size)
+    page = PaginationMetadata(next="100", limit=page_size)
+
+    async def run_sync(func, *args):
+        return func(*args)
+
+    results = [
+        await cpu_per_call("products_pydantic", lambda: run_sync(products_pydantic, products, page), iterations),
+        await cpu_per_call("products_orjson", lambda: run_sync(products_orjson, products, page), iterations),
+        await cpu_per_call("orders_pydantic_response_model", lambda: orders_pydantic(orders, page), iterations),
+        await cpu_per_call("orders_orjson", lambda: orders_orjson(orders, page), iterations),
+    ]
+
+    # Whole requests through the app, served from the in-memory backend
+    import httpx
+    from main import app
+
+    storage = MemoryStorage()
+    set_storage(storage)
+    for product in product_rows(page_size):
+        await storage.products.insert({**product, "nameLower": product["name"].lower(), "sizes": []})
+    await storage.orders.insert_many([
+        {**{key: row[key] for key in ("items", "total")}, "userId": "user_0", "createdAt": ""}
+        for row in order_rows(page_size)
+    ])
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        request_iterations = max(1, iterations // 10)
+        results.append(await cpu_per_call(
+            "request_products_page", lambda: client.get(f"/products?limit={page_size}"), request_iterations
+        ))
+        results.append(await cpu_per_call(
+            "request_orders_page", lambda: client.get(f"/orders/user_0?limit={page_size}"), request_iterations
+        ))
+
+    report("serialization", results)
+
+if __name__ == "__main__":
+    asyncio.run(main())
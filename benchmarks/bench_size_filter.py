@@ -0,0 +1,99 @@
+"""
+Benchmark and explain the size / in-stock filters of GET /products.
+
+Against a real mongod (MONGODB_URL) the winning plan of every filter
+combination is asserted to be an index scan on the sizes multikey index or
+the nameLower index. Exits with status 1 if a plan falls back to a
+collection scan.
+
+Usage: python benchmarks/bench_size_filter.py [products] [iterations]
+"""
+
+import asyncio
+import os
+import random
+import sys
+
+from common import open_database, measure, report
+from database import create_indexes
+from routes.products import _find_products
+from storage import ProductQuery
+from storage.mongo import build_product_filter
+
+SIZES = ["XS", "S", "M", "L", "XL", "XXL"]
+SIZE_INDEX = "sizes.size_1_sizes.quantity_1"
+NAME_INDEX = "nameLower_1"
+CASES = [
+    ("size", dict(name=None, match=None, size="XL", in_stock=False)),
+    ("size_in_stock", dict(name=None, match=None, size="XL", in_stock=True)),
+    ("size_in_stock_name", dict(name="product 1", match="prefix", size="XL", in_stock=True)),
+]
+
+async def seed(db, count: int):
+    """Insert products with a few size variants each, many of them sold out"""
+    rng = random.Random(7)
+    batch = []
+    for i in range(count):
+        name = f"Product {i}"
+        batch.append({
+            "name": name,
+            "nameLower": name.lower(),
+            "price": 100.0,
+            "sizes": [
+                {"size": size, "quantity": rng.choice([0, 0, 0, rng.randint(1, 10)])}
+                for size in rng.sample(SIZES, 3)
+            ],
+        })
+    await db.products.insert_many(batch)
+    await create_indexes()
+
+def index_scans(stage: dict) -> list:
+    """Names of the indexes scanned anywhere in a plan tree"""
+    names = [stage["indexName"]] if stage.get("stage") == "IXSCAN" else []
+    for key in ("inputStage", "queryPlan"):
+        if key in stage:
+            names += index_scans(stage[key])
+    for child in stage.get("inputStages", []):
+        names += index_scans(child)
+    return names
+
+async def explain_cases(db) -> list:
+    """Explain each filter combination, sorted by _id like the listing"""
+    failures = []
+    for label, params in CASES:
+        query = ProductQuery(
+            name=params["name"], match=params["match"] or "prefix", size=params["size"], in_stock=params["in_stock"]
+        )
+        query_filter = build_product_filter(query)
+        plan = await db.products.find(query_filter).sort("_id", 1).limit(10).explain()
+        scanned = index_scans(plan["queryPlanner"]["winningPlan"])
+        if not {SIZE_INDEX, NAME_INDEX} & set(scanned):
+            failures.append({"label": label, "filter": str(query_filter), "indexes": scanned})
+    return failures
+
+async def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    iterations = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+    
+    db, counter = await open_database()
+    await seed(db, count)
+    
+    results = []
+    for label, params in CASES:
+        results.append(await measure(
+            label,
+            lambda: _find_products(**params, limit=10, offset=0, after=None, before=None),
+            iterations,
+            counter,
+        ))
+    
+    # The mongomock stand-in has no query planner
+    failures = await explain_cases(db) if os.getenv("MONGODB_URL") else []
+    results.append({"label": "explain", "checked": bool(os.getenv("MONGODB_URL")), "failures": failures})
+    report("size_filter", results)
+    
+    if failures:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    asyncio.run(main())
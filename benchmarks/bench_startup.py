@@ -0,0 +1,110 @@
+"""
+Benchmark worker startup: import time, time to first request and time to ready.
+
+Imports main under `python -X importtime` and reports the slowest modules
+by cumulative time, then starts `uvicorn main:app` and polls /health (first
+served request) and /health/ready (database answered) until both respond.
+Uses the memory backend unless MONGODB_URL is set; with an unreachable
+MONGODB_URL, /health is still served at once while /health/ready reports
+"starting".
+
+Usage: python benchmarks/bench_startup.py [runs] [top_modules]
+"""
+
+import os
+import re
+import socket
+import subprocess
+import sys
+import time
+import urllib.error
+import urllib.request
+
+from common import percentile, report
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+STARTUP_TIMEOUT = 60.0
+
+def import_profile(top: int) -> dict:
+    """Total and slowest modules (cumulative microseconds) from -X importtime"""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import main"],
+        cwd=ROOT, capture_output=True, text=True, check=True
+    )
+    modules = []
+    for line in result.stderr.splitlines():
+        match = re.match(r"import time:\s+\d+ \|\s+(\d+) \|\s+(\S+)", line)
+        if match:
+            modules.append((match.group(2), int(match.group(1))))
+    
+    total = next(cumulative for name, cumulative in modules if name == "main")
+    slowest = sorted(modules, key=lambda module: module[1], reverse=True)[:top]
+    return {
+        "total_ms": round(total / 1000, 1),
+        "slowest": [{"module": name, "cumulative_ms": round(cumulative / 1000, 1)} for name, cumulative in slowest],
+    }
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+def get_status(url: str) -> int:
+    """HTTP status of GET url, 0 when nothing is listening yet"""
+    try:
+        with urllib.request.urlopen(url, timeout=1) as response:
+            return response.status
+    except urllib.error.HTTPError as e:
+        return e.code
+    except (urllib.error.URLError, ConnectionError):
+        return 0
+
+def start_server() -> dict:
+    """Start one uvicorn worker and time its first and first ready response"""
+    port = free_port()
+    base_url = f"http://127.0.0.1:{port}"
+    start = time.perf_counter()
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--port", str(port), "--log-level", "warning"],
+        cwd=ROOT, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    first_request = ready = None
+    try:
+        while time.perf_counter() - start < STARTUP_TIMEOUT:
+            if first_request is None and get_status(f"{base_url}/health") == 200:
+                first_request = time.perf_counter() - start
+            if first_request is not None and get_status(f"{base_url}/health/ready") == 200:
+                ready = time.perf_counter() - start
+                break
+            time.sleep(0.01)
+    finally:
+        server.terminate()
+        server.wait()
+    return {"first_request": first_request, "ready": ready}
+
+def summarize(label: str, samples: list) -> dict:
+    completed = [sample * 1000 for sample in samples if sample is not None]
+    result = {"label": label, "runs": len(samples), "completed": len(completed)}
+    if completed:
+        result["p50_ms"] = round(percentile(completed, 50), 1)
+        result["max_ms"] = round(max(completed), 1)
+    return result
+
+def main():
+    runs = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+    top = int(sys.argv[2]) if len(sys.argv) > 2 else 15
+    
+    if not os.getenv("MONGODB_URL"):
+        os.environ["STORAGE_BACKEND"] = "memory"
+    
+    profile = import_profile(top)
+    timings = [start_server() for _ in range(runs)]
+    results = [
+        {"label": "import_main", **profile},
+        summarize("first_request", [timing["first_request"] for timing in timings]),
+        summarize("ready", [timing["ready"] for timing in timings]),
+    ]
+    report("startup", results, config={"runs": runs, "backend": os.environ.get("STORAGE_BACKEND", "mongo")})
+
+if __name__ == "__main__":
+    main()
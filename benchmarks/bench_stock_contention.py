@@ -0,0 +1,78 @@
+"""
+Concurrent load test for stock reservation in POST /orders.
+
+Fires many concurrent single-unit orders at one size variant with limited
+stock and checks that exactly the available quantity was sold. Exits with
+status 1 if the variant was oversold.
+
+Usage: python benchmarks/bench_stock_contention.py [stock] [orders] [concurrency]
+"""
+
+import asyncio
+import sys
+import time
+
+from fastapi import HTTPException
+
+from common import open_database, report
+from models import OrderCreate
+from routes.orders import create_order
+
+PRODUCT_ID = "contended_product"
+
+async def main():
+    stock = int(sys.argv[1]) if len(sys.argv) > 1 else 100
+    count = int(sys.argv[2]) if len(sys.argv) > 2 else 1000
+    concurrency = int(sys.argv[3]) if len(sys.argv) > 3 else 64
+    
+    db, counter = await open_database()
+    await db.products.insert_one({
+        "_id": PRODUCT_ID,
+        "name": "Contended Product",
+        "price": 499.0,
+        "sizes": [{"size": "M", "quantity": stock}, {"size": "L", "quantity": stock}],
+    })
+    
+    semaphore = asyncio.Semaphore(concurrency)
+    outcomes = {"created": 0, "rejected": 0}
+    
+    async def place_order(user_index: int):
+        order = OrderCreate(
+            userId=f"user_{user_index}",
+            items=[{"productId": PRODUCT_ID, "size": "M", "qty": 1}],
+        )
+        async with semaphore:
+            try:
+                await create_order(order, idempotency_key=None)
+                outcomes["created"] += 1
+            except HTTPException as e:
+                if e.status_code != 409:
+                    raise
+                outcomes["rejected"] += 1
+    
+    start = time.perf_counter()
+    await asyncio.gather(*(place_order(i) for i in range(count)))
+    elapsed = time.perf_counter() - start
+    
+    product = await db.products.find_one({"_id": PRODUCT_ID})
+    remaining = {variant["size"]: variant["quantity"] for variant in product["sizes"]}
+    stored_orders = await db.orders.count_documents({})
+    oversold = remaining["M"] < 0 or stored_orders > stock or outcomes["created"] + remaining["M"] != stock
+    
+    report("stock_contention", [{
+        "stock": stock,
+        "orders_attempted": count,
+        "concurrency": concurrency,
+        "orders_created": outcomes["created"],
+        "orders_rejected": outcomes["rejected"],
+        "remaining_stock": remaining,
+        "oversold": oversold,
+        "round_trips": counter.count,
+        "orders_per_sec": round(count / elapsed, 1),
+    }])
+    
+    if oversold:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,127 @@
+"""
+Shared helpers for the benchmark scripts.
+
+Benchmarks run against a local mongod when MONGODB_URL is set, otherwise
+against an in-process mongomock stand-in (pip install mongomock-motor).
+"""
+
+import json
+import os
+import sys
+import time
+from pymongo import monitoring
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Measure the database work, not the listing response cache
+os.environ.setdefault("RESPONSE_CACHE_TTL_SECONDS", "0")
+
+from database import mongodb
+from storage import set_storage
+from storage.mongo import MongoStorage
+
+# Collection methods that cost one round trip on the mongomock stand-in
+_ROUND_TRIP_METHODS = {
+    "find", "find_one", "find_one_and_update", "insert_one", "insert_many",
+    "update_one", "update_many", "delete_one", "delete_many", "bulk_write",
+    "count_documents", "estimated_document_count", "aggregate",
+}
+
+class RoundTripCounter(monitoring.CommandListener):
+    """Count database commands sent by the driver"""
+
+    def __init__(self):
+        self.count = 0
+
+    def started(self, event):
+        self.count += 1
+
+    def succeeded(self, event):
+        pass
+
+    def failed(self, event):
+        pass
+
+class _CountingCollection:
+    """Collection proxy that counts round trips on the mongomock stand-in"""
+
+    def __init__(self, collection, counter: RoundTripCounter):
+        self._collection = collection
+        self._counter = counter
+
+    def __getattr__(self, name):
+        attr = getattr(self._collection, name)
+        if name not in _ROUND_TRIP_METHODS:
+            return attr
+
+        def counted(*args, **kwargs):
+            self._counter.count += 1
+            return attr(*args, **kwargs)
+
+        return counted
+
+class _CountingDatabase:
+    """Database proxy handing out counting collections"""
+
+    def __init__(self, database, counter: RoundTripCounter):
+        self._database = database
+        self._counter = counter
+
+    def __getattr__(self, name):
+        return _CountingCollection(self._database[name], self._counter)
+
+    def __getitem__(self, name):
+        return _CountingCollection(self._database[name], self._counter)
+
+async def open_database(database_name: str = "ecommerce_bench"):
+    """Connect the app's database handle to a fresh benchmark database"""
+    counter = RoundTripCounter()
+    mongodb_url = os.getenv("MONGODB_URL")
+    
+    if mongodb_url:
+        from motor.motor_asyncio import AsyncIOMotorClient
+        client = AsyncIOMotorClient(mongodb_url, event_listeners=[counter])
+        await client.drop_database(database_name)
+        database = client[database_name]
+    else:
+        from mongomock_motor import AsyncMongoMockClient
+        client = AsyncMongoMockClient()
+        database = _CountingDatabase(client[database_name], counter)
+    
+    mongodb.client = client
+    mongodb.database = database
+    mongodb.connected = True
+    set_storage(MongoStorage())
+    return database, counter
+
+def percentile(samples, pct: float) -> float:
+    """Nearest-rank percentile of a list of samples"""
+    ordered = sorted(samples)
+    index = max(0, min(len(ordered) - 1, round(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+async def measure(label: str, func, iterations: int, counter: RoundTripCounter) -> dict:
+    """Await func() repeatedly and summarize latency and round trips"""
+    samples = []
+    counter.count = 0
+    
+    for _ in range(iterations):
+        start = time.perf_counter()
+        await func()
+        samples.append((time.perf_counter() - start) * 1000)
+    
+    return {
+        "label": label,
+        "iterations": iterations,
+        "round_trips_per_call": counter.count / iterations,
+        "p50_ms": round(percentile(samples, 50), 3),
+        "p99_ms": round(percentile(samples, 99), 3),
+    }
+
+def report(benchmark: str, results: list, config: dict = None):
+    """Print benchmark results (and the run configuration) as JSON"""
+    output = {"benchmark": benchmark}
+    if config is not None:
+        output["config"] = config
+    output["results"] = results
+    print(json.dumps(output, indent=2))
@@ -0,0 +1,180 @@
+"""
+Load test every endpoint through the ASGI app with concurrent clients.
+
+Seeds products and orders, creates a few more products through POST
+/products (ObjectId _ids, as in production; the seeded ones have string
+_ids), then drives the app in-process with httpx
+(pip install httpx) and reports throughput, p50/p95/p99 latency, errors
+and database round trips per request for each scenario. Redirect the
+JSON output to a file to diff runs across commits.
+
+Usage: python benchmarks/load_test.py [--backend mongo|memory] [--products N]
+       [--orders M] [--users U] [--requests R] [--concurrency C]
+"""
+
+import argparse
+import asyncio
+import random
+import subprocess
+import time
+from datetime import datetime
+
+from common import open_database, percentile, report
+from storage import get_storage, set_storage
+from storage.memory import MemoryStorage
+
+SIZES = ["S", "M", "L"]
+
+API_PRODUCTS = 10
+
+def scenarios(args, rng: random.Random, api_product_ids: list) -> list:
+    """(label, request factory) pairs; each factory returns (method, url, json)"""
+    def product_id() -> str:
+        return f"product_{rng.randrange(args.products)}"
+
+    def user_id() -> str:
+        return f"user_{rng.randrange(args.users)}"
+
+    return [
+        ("health", lambda: ("GET", "/health", None)),
+        ("list_products", lambda: ("GET", f"/products?limit=10&offset={rng.randrange(min(args.products, 1000))}", None)),
+        ("list_products_by_name", lambda: ("GET", f"/products?name=product%20{rng.randrange(100)}&match=prefix", None)),
+        ("list_products_by_size", lambda: ("GET", f"/products?size={rng.choice(SIZES)}&in_stock=true", None)),
+        ("get_user_orders", lambda: ("GET", f"/orders/{user_id()}?limit=10", None)),
+        ("get_user_order_summary", lambda: ("GET", f"/orders/{user_id()}/summary", None)),
+        ("create_order", lambda: ("POST", "/orders", {
+            "userId": user_id(),
+            "items": [
+                {"productId": product_id(), "size": rng.choice(SIZES), "qty": 1}
+                for _ in range(rng.randint(1, 3))
+            ],
+        })),
+        ("create_order_api_product", lambda: ("POST", "/orders", {
+            "userId": user_id(),
+            "items": [{"productId": rng.choice(api_product_ids), "size": rng.choice(SIZES), "qty": 1}],
+        })),
+    ]
+
+async def seed(args, rng: random.Random):
+    """Insert the product catalogue and order history through the storage backend"""
+    storage = get_storage()
+    for i in range(args.products):
+        await storage.products.insert({
+            "_id": f"product_{i}",
+            "name": f"Product {i}",
+            "nameLower": f"product {i}",
+            "price": 100.0 + i,
+            "sizes": [{"size": size, "quantity": 10 ** 9} for size in SIZES],
+        })
+
+    created_at = datetime.utcnow().isoformat()
+    orders = []
+    for o in range(args.orders):
+        items = []
+        for _ in range(rng.randint(1, 3)):
+            i = rng.randrange(args.products)
+            items.append({
+                "productId": f"product_{i}",
+                "name": f"Product {i}",
+                "unitPrice": 100.0 + i,
+                "size": rng.choice(SIZES),
+                "qty": 1,
+            })
+        orders.append({
+            "userId": f"user_{o % args.users}",
+            "items": items,
+            "total": sum(item["unitPrice"] * item["qty"] for item in items),
+            "createdAt": created_at,
+        })
+    await storage.orders.insert_many(orders)
+
+async def create_api_products(client) -> list:
+    """Create products through POST /products and return their ids"""
+    product_ids = []
+    for i in range(API_PRODUCTS):
+        response = await client.post("/products", json={
+            "name": f"API Product {i}",
+            "price": 199.0 + i,
+            "sizes": [{"size": size, "quantity": 10 ** 9} for size in SIZES],
+        })
+        response.raise_for_status()
+        product_ids.append(response.json()["id"])
+    return product_ids
+
+async def run_scenario(client, label: str, make_request, args, counter) -> dict:
+    """Send args.requests requests from args.concurrency concurrent clients"""
+    requests = [make_request() for _ in range(args.requests)]
+    samples = []
+    errors = 0
+    remaining = iter(requests)
+
+    async def client_loop():
+        nonlocal errors
+        for method, url, body in remaining:
+            start = time.perf_counter()
+            response = await client.request(method, url, json=body)
+            samples.append((time.perf_counter() - start) * 1000)
+            if response.status_code >= 400:
+                errors += 1
+
+    if counter is not None:
+        counter.count = 0
+    start = time.perf_counter()
+    await asyncio.gather(*(client_loop() for _ in range(args.concurrency)))
+    elapsed = time.perf_counter() - start
+
+    return {
+        "label": label,
+        "requests": args.requests,
+        "concurrency": args.concurrency,
+        "errors": errors,
+        "requests_per_sec": round(args.requests / elapsed, 1),
+        "round_trips_per_request": counter.count / args.requests if counter is not None else None,
+        "p50_ms": round(percentile(samples, 50), 3),
+        "p95_ms": round(percentile(samples, 95), 3),
+        "p99_ms": round(percentile(samples, 99), 3),
+    }
+
+def git_revision():
+    """Short commit hash of the working tree, if available"""
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--backend", choices=["mongo", "memory"], default="mongo",
+                        help="mongo: MONGODB_URL or the mongomock stand-in; memory: in-process storage")
+    parser.add_argument("--products", type=int, default=1000)
+    parser.add_argument("--orders", type=int, default=5000)
+    parser.add_argument("--users", type=int, default=100)
+    parser.add_argument("--requests", type=int, default=2000, help="requests per scenario")
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    import httpx
+    from main import app
+
+    rng = random.Random(args.seed)
+    if args.backend == "memory":
+        set_storage(MemoryStorage())
+        counter = None
+    else:
+        _, counter = await open_database()
+    await seed(args, rng)
+
+    results = []
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        api_product_ids = await create_api_products(client)
+        for label, make_request in scenarios(args, rng, api_product_ids):
+            results.append(await run_scenario(client, label, make_request, args, counter))
+
+    report("load_test", results, config={**vars(args), "revision": git_revision()})
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -1,9 +1,13 @@
+import asyncio
 import os
 from motor.motor_asyncio import AsyncIOMotorClient
 from pymongo.server_api import ServerApi
+from pymongo.read_preferences import Primary, PrimaryPreferred, Secondary, SecondaryPreferred, Nearest
 from typing import Optional
 import logging
 from bson import ObjectId
+from utils.db_monitoring import command_timing, pool_stats
+from utils.metrics import command_metrics, pool_metrics
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -12,11 +16,75 @@ logger = logging.getLogger(__name__)
 class MongoDB:
     client: Optional[AsyncIOMotorClient] = None
     database = None
+    product_read_database = None
+    # Set once the first ping succeeded and the pool is warm
+    connected: bool = False
+    startup_task: Optional[asyncio.Task] = None
 
 mongodb = MongoDB()
 
-async def connect_to_mongodb():
-    """Create MongoDB Atlas connection"""
+READ_PREFERENCES = {
+    "primary": Primary,
+    "primaryPreferred": PrimaryPreferred,
+    "secondary": Secondary,
+    "secondaryPreferred": SecondaryPreferred,
+    "nearest": Nearest,
+}
+
+# Client options read from the environment; unset ones keep driver defaults
+CLIENT_OPTIONS_FROM_ENV = {
+    "maxPoolSize": ("MONGODB_MAX_POOL_SIZE", int),
+    "minPoolSize": ("MONGODB_MIN_POOL_SIZE", int),
+    "maxIdleTimeMS": ("MONGODB_MAX_IDLE_TIME_MS", int),
+    "maxConnecting": ("MONGODB_MAX_CONNECTING", int),
+    "waitQueueTimeoutMS": ("MONGODB_WAIT_QUEUE_TIMEOUT_MS", int),
+    "serverSelectionTimeoutMS": ("MONGODB_SERVER_SELECTION_TIMEOUT_MS", int),
+    "connectTimeoutMS": ("MONGODB_CONNECT_TIMEOUT_MS", int),
+    "socketTimeoutMS": ("MONGODB_SOCKET_TIMEOUT_MS", int),
+    "compressors": ("MONGODB_COMPRESSORS", str),
+}
+
+def get_client_options() -> dict:
+    """Motor client options from environment variables"""
+    options = {}
+    for option, (env_name, cast) in CLIENT_OPTIONS_FROM_ENV.items():
+        value = os.getenv(env_name)
+        if value:
+            options[option] = cast(value)
+    return options
+
+def get_read_preference(env_name: str, default: str = "primary"):
+    """Read preference named by an environment variable"""
+    mode = os.getenv(env_name, default)
+    if mode not in READ_PREFERENCES:
+        raise Exception(f"{env_name} must be one of {', '.join(READ_PREFERENCES)}, got '{mode}'")
+    
+    if mode == "primary":
+        return Primary()
+    
+    max_staleness = int(os.getenv("MONGODB_MAX_STALENESS_SECONDS", "-1"))
+    return READ_PREFERENCES[mode](max_staleness=max_staleness)
+
+def create_client(mongodb_url: str, event_listeners: list = ()) -> AsyncIOMotorClient:
+    """Motor client for Atlas; writes always go to the primary"""
+    return AsyncIOMotorClient(
+        mongodb_url,
+        server_api=ServerApi('1'),
+        retryWrites=True,
+        w='majority',
+        read_preference=get_read_preference("MONGODB_READ_PREFERENCE"),
+        event_listeners=list(event_listeners),
+        **get_client_options()
+    )
+
+async def connect_to_mongodb(background: bool = False):
+    """Create MongoDB Atlas connection
+    
+    The driver connects lazily. By default this waits for a ping; with
+    background=True the ping, pool warm-up and index creation run in a
+    background task, so a worker can serve straight away while
+    check_database_health reports "starting".
+    """
     try:
         # Get MongoDB URL from environment variable
         mongodb_url = os.getenv("MONGODB_URL")
@@ -28,49 +96,115 @@ async def connect_to_mongodb():
         logger.info("Connecting to MongoDB Atlas...")
         
         # Create client for Atlas connection
-        mongodb.client = AsyncIOMotorClient(
+        mongodb.client = create_client(
             mongodb_url,
-            server_api=ServerApi('1'),
-            retryWrites=True,
-            w='majority'
+            event_listeners=[pool_stats, command_timing, pool_metrics, command_metrics]
         )
         
         # Get database
         mongodb.database = mongodb.client[database_name]
         
+        # Product catalogue reads may be served by secondaries
+        mongodb.product_read_database = mongodb.client.get_database(
+            database_name,
+            read_preference=get_read_preference("MONGODB_PRODUCT_READ_PREFERENCE")
+        )
+        
+        if background:
+            mongodb.startup_task = asyncio.create_task(prepare_connection())
+            return
+        
         # Test the connection
         await mongodb.client.admin.command('ping')
+        mongodb.connected = True
         logger.info("Successfully connected to MongoDB Atlas!")
         
-        # Create indexes for better performance
-        await create_indexes()
-        
     except Exception as e:
         logger.error(f"Error connecting to MongoDB Atlas: {e}")
         raise
 
+async def prepare_connection(retry_delay: float = 5.0):
+    """Ping until MongoDB answers, warm the pool, then create indexes if enabled"""
+    while True:
+        try:
+            await mongodb.client.admin.command('ping')
+            break
+        except Exception as e:
+            logger.warning(f"MongoDB not reachable yet, retrying in {retry_delay}s: {e}")
+            await asyncio.sleep(retry_delay)
+    
+    # Open pooled connections before requests need them
+    try:
+        await warm_connection_pool(int(os.getenv("MONGODB_WARM_CONNECTIONS", "4")))
+    except Exception as e:
+        logger.warning(f"Could not warm the connection pool: {e}")
+    
+    mongodb.connected = True
+    logger.info("Successfully connected to MongoDB Atlas!")
+    
+    # Off the startup path; normally done once per deploy with
+    # `python migrations.py create_indexes`
+    if os.getenv("MONGODB_CREATE_INDEXES", "true").lower() == "true":
+        try:
+            await create_indexes()
+        except Exception as e:
+            logger.warning(f"Could not create indexes: {e}")
+
+async def warm_connection_pool(connections: int):
+    """Establish up to `connections` pooled connections with concurrent pings"""
+    if connections > 0:
+        await asyncio.gather(*(mongodb.client.admin.command('ping') for _ in range(connections)))
+        logger.info(f"Warmed the connection pool with {connections} connections")
+
 async def close_mongodb_connection():
     """Close database connection"""
+    if mongodb.startup_task:
+        mongodb.startup_task.cancel()
+        try:
+            await mongodb.startup_task
+        except asyncio.CancelledError:
+            pass
+        mongodb.startup_task = None
+    
     if mongodb.client:
         mongodb.client.close()
+        mongodb.connected = False
         logger.info("MongoDB connection closed")
 
-async def create_indexes():
-    """Create database indexes for better performance"""
+async def create_indexes(db=None):
+    """Create database indexes for better performance (idempotent)
+    
+    Uses the connected database unless another database handle is given.
+    """
+    if db is None:
+        db = mongodb.database
+    
     try:
-        # Index on product name for faster text searches
-        await mongodb.database.products.create_index("name")
+        # Index on the normalized product name for anchored prefix searches
+        await db.products.create_index("nameLower")
+        
+        # Compound index on user ID and _id so a user's order page is a
+        # sorted index range scan
+        await db.orders.create_index([("userId", 1), ("_id", 1)])
         
-        # Index on user ID for faster order queries
-        await mongodb.database.orders.create_index("userId")
+        # Multikey index over size variants for size and in-stock filters
+        await db.products.create_index([("sizes.size", 1), ("sizes.quantity", 1)])
         
         # Text index for product search
-        await mongodb.database.products.create_index([("name", "text")])
+        await db.products.create_index([("name", "text")])
+        
+        # External SKU for catalogue imports; products created through the
+        # API have none
+        await db.products.create_index("sku", unique=True, sparse=True)
+        
+        # Idempotency keys are unique as _id; expire them at expiresAt
+        await db.idempotency_keys.create_index("expiresAt", expireAfterSeconds=0)
         
         logger.info("Database indexes created successfully")
         
     except Exception as e:
-        logger.warning(f"Could not create indexes: {e}")
+        logger.error(f"Error creating indexes: {e}")
+        raise
 
 def get_database():
     """Get database instance"""
@@ -78,14 +212,28 @@ def get_database():
         raise Exception("Database not connected. Call connect_to_mongodb() first.")
     return mongodb.database
 
+def get_product_read_database():
+    """Get database instance for product catalogue reads
+    
+    Uses MONGODB_PRODUCT_READ_PREFERENCE, so listings and product lookups can
+    be served by secondaries while order writes stay on the primary.
+    """
+    if mongodb.product_read_database is None:
+        return get_database()
+    return mongodb.product_read_database
+
 # Health check function
-async def check_database_health():
-    """Check if database is healthy"""
+async def check_database_health(timeout: float = 2.0):
+    """Check if database is healthy, giving up on the ping after timeout seconds"""
     try:
-        if mongodb.client:
-            await mongodb.client.admin.command('ping')
-            return {"status": "healthy", "database": "mongodb_atlas"}
+        if mongodb.client and not mongodb.connected:
+            return {"status": "starting", "database": "mongodb_atlas"}
+        elif mongodb.client:
+            await asyncio.wait_for(mongodb.client.admin.command('ping'), timeout)
+            return {"status": "healthy", "database": "mongodb_atlas", "pool": pool_stats.stats()}
         else:
             return {"status": "disconnected", "database": "mongodb_atlas"}
+    except asyncio.TimeoutError:
+        return {"status": "timeout", "database": "mongodb_atlas", "error": f"No ping response within {timeout}s"}
     except Exception as e:
         return {"status": "error", "database": "mongodb_atlas", "error": str(e)}
\ No newline at end of file
@@ -1,22 +1,59 @@
 from dotenv import load_dotenv
 load_dotenv()
-from fastapi import FastAPI
+from fastapi import FastAPI, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.staticfiles import StaticFiles
-from fastapi.responses import FileResponse
+from fastapi.responses import JSONResponse, ORJSONResponse
 from routes.products import router as products_router
 from routes.orders import router as orders_router
-from database import connect_to_mongodb
+from contextlib import asynccontextmanager
+from storage import close_storage, get_storage, init_storage
+from utils.compression import CompressionMiddleware
+from utils.lifecycle import InFlightMiddleware, in_flight
+from utils.product_cache import start_product_cache_invalidation, stop_product_cache_invalidation
+from utils.request_timing import start_request_timing, finish_request_timing
+from utils.metrics import REQUESTS_IN_FLIGHT, observe_request, render_metrics, mark_worker_dead
+from utils.static_files import PrecompressedStaticFiles
 # Add to main.py, routes files
 import sys
 import os
+import time
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
-import uvicorn
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Connect the storage backend on startup; on shutdown drain requests, then close it"""
+    storage = await init_storage()
+    
+    # Other workers' product writes only reach this one through MongoDB
+    if storage.name == "mongo":
+        start_product_cache_invalidation()
+    
+    try:
+        yield
+    finally:
+        # The server has stopped accepting requests; let running ones
+        # (including streamed exports) finish before the client closes
+        await in_flight.drain(float(os.getenv("GRACEFUL_SHUTDOWN_SECONDS", "30")))
+        await stop_product_cache_invalidation()
+        await close_storage()
+        mark_worker_dead()
 
 app = FastAPI(
     title="Ecommerce API",
     description="FastAPI backend for ecommerce application with MongoDB. All prices are in Indian Rupees (₹).",
-    version="1.0.0"
+    version="1.0.0",
+    default_response_class=ORJSONResponse,
+    lifespan=lifespan
+)
+
+# Compress API responses above COMPRESSION_MINIMUM_SIZE bytes. Added
+# first, so it is innermost and sees whole bodies rather than the chunks
+# the @app.middleware layers re-stream
+app.add_middleware(
+    CompressionMiddleware,
+    minimum_size=int(os.getenv("COMPRESSION_MINIMUM_SIZE", "1000")),
+    compresslevel=int(os.getenv("GZIP_COMPRESSION_LEVEL", "6")),
+    brotli_quality=int(os.getenv("BROTLI_QUALITY", "4")),
 )
 
 # Add CORS middleware
@@ -28,26 +65,77 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Mount static files
-app.mount("/static", StaticFiles(directory="static"), name="static")
+@app.middleware("http")
+async def request_timing_middleware(request: Request, call_next):
+    """Report DB commands and phase timings for sampled requests"""
+    timing = start_request_timing()
+    response = await call_next(request)
+    if timing is not None:
+        finish_request_timing(timing, request, response)
+    return response
+
+@app.middleware("http")
+async def metrics_middleware(request: Request, call_next):
+    """Count requests and observe latency per route and status"""
+    REQUESTS_IN_FLIGHT.inc()
+    start = time.perf_counter()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        return response
+    finally:
+        REQUESTS_IN_FLIGHT.dec()
+        observe_request(request, status, time.perf_counter() - start)
+
+# Outermost, so a request counts until its response is fully sent
+app.add_middleware(InFlightMiddleware)
+
+# Mount static files, served precompressed when run_production.py has
+# written .br/.gz copies
+app.mount(
+    "/static",
+    PrecompressedStaticFiles(
+        directory="static",
+        cache_control=f"public, max-age={int(os.getenv('STATIC_MAX_AGE_SECONDS', '86400'))}"
+    ),
+    name="static"
+)
+
+# The entry page is revalidated on every load, so new deploys show at once
+index_page = PrecompressedStaticFiles(directory="static", cache_control="no-cache")
 
 # Include routers
 app.include_router(products_router, prefix="/products", tags=["products"])
 app.include_router(orders_router, prefix="/orders", tags=["orders"])
 
-@app.on_event("startup")
-async def startup_event():
-    """Connect to MongoDB on startup"""
-    await connect_to_mongodb()
-
 @app.get("/")
-async def root():
+async def root(request: Request):
     """Serve the main interface"""
-    return FileResponse('static/index.html')
+    return await index_page.get_response("index.html", request.scope)
 
 @app.get("/health")
 async def health_check():
     return {"status": "healthy"}
 
+@app.get("/health/ready")
+async def readiness_check():
+    """Ready when the storage backend answers within READINESS_TIMEOUT_SECONDS"""
+    try:
+        health = await get_storage().health(float(os.getenv("READINESS_TIMEOUT_SECONDS", "2")))
+    except Exception as e:
+        health = {"status": "error", "error": str(e)}
+    
+    status_code = 200 if health["status"] == "healthy" else 503
+    return JSONResponse(status_code=status_code, content=health)
+
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    """Prometheus metrics"""
+    body, content_type = render_metrics()
+    return Response(content=body, media_type=content_type)
+
 if __name__ == "__main__":
+    # Only needed when run directly, so workers don't pay for the import
+    import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8000)
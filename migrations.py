@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+"""
+Idempotent database migrations
+
+Usage: python migrations.py <migration> [<migration> ...]
+"""
+
+from dotenv import load_dotenv
+load_dotenv()
+import asyncio
+import sys
+import logging
+from pymongo import UpdateOne
+import database
+from database import connect_to_mongodb, close_mongodb_connection, get_database
+from storage.mongo import apply_user_stats
+
+logger = logging.getLogger(__name__)
+
+async def create_indexes():
+    """Create or confirm every index the API relies on"""
+    await database.create_indexes()
+
+async def backfill_name_lower():
+    """Store the normalized lowercase name used by prefix search on every product"""
+    db = get_database()
+    result = await db.products.update_many(
+        {"nameLower": {"$exists": False}},
+        [{"$set": {"nameLower": {"$toLower": "$name"}}}]
+    )
+    logger.info(f"Backfilled nameLower on {result.modified_count} products")
+
+async def backfill_order_snapshots(batch_size: int = 500):
+    """Snapshot product name and unit price into order lines that lack them"""
+    db = get_database()
+    updated = 0
+    
+    while True:
+        orders = await db.orders.find(
+            {"items": {"$elemMatch": {"name": {"$exists": False}}}},
+            {"items": 1}
+        ).limit(batch_size).to_list(length=batch_size)
+        if not orders:
+            break
+        
+        product_ids = list({item["productId"] for order in orders for item in order["items"]})
+        products = {
+            product["_id"]: product
+            async for product in db.products.find({"_id": {"$in": product_ids}}, {"name": 1, "price": 1})
+        }
+        
+        requests = []
+        for order in orders:
+            items = []
+            for item in order["items"]:
+                product = products.get(item["productId"])
+                if "name" not in item:
+                    # Lines of deleted products get an empty snapshot and are
+                    # still skipped when orders are listed
+                    item["name"] = product["name"] if product else None
+                    item["unitPrice"] = product["price"] if product else None
+                items.append(item)
+            requests.append(UpdateOne({"_id": order["_id"]}, {"$set": {"items": items}}))
+        
+        result = await db.orders.bulk_write(requests, ordered=False)
+        updated += result.modified_count
+    
+    logger.info(f"Backfilled line snapshots on {updated} orders")
+
+async def rebuild_user_order_stats(batch_size: int = 1000):
+    """Recompute user_order_stats (order count and spend per user) from all orders"""
+    db = get_database()
+    staging = db.user_order_stats_rebuild
+    await staging.drop()
+    counted = 0
+    
+    # Aggregate each batch of orders into $inc upserts on a staging
+    # collection, then swap it in. Orders placed while this runs may be
+    # left out, so run it during a quiet period.
+    batch = []
+    cursor = db.orders.find({}, {"userId": 1, "total": 1, "createdAt": 1}).sort("_id", 1).batch_size(batch_size)
+    async for order in cursor:
+        batch.append(order)
+        if len(batch) >= batch_size:
+            await apply_user_stats(staging, batch)
+            counted += len(batch)
+            batch = []
+    if batch:
+        await apply_user_stats(staging, batch)
+        counted += len(batch)
+    
+    if counted:
+        await staging.rename("user_order_stats", dropTarget=True)
+    else:
+        await db.user_order_stats.drop()
+    logger.info(f"Rebuilt user_order_stats from {counted} orders")
+
+MIGRATIONS = {
+    "create_indexes": create_indexes,
+    "backfill_name_lower": backfill_name_lower,
+    "backfill_order_snapshots": backfill_order_snapshots,
+    "rebuild_user_order_stats": rebuild_user_order_stats,
+}
+
+async def run(names):
+    """Run the named migrations in order"""
+    await connect_to_mongodb()
+    try:
+        for name in names:
+            logger.info(f"Running migration {name}")
+            await MIGRATIONS[name]()
+    finally:
+        await close_mongodb_connection()
+
+def main():
+    names = sys.argv[1:]
+    unknown = [name for name in names if name not in MIGRATIONS]
+    if not names or unknown:
+        print(__doc__.strip())
+        print("\nAvailable migrations:")
+        for name, migration in MIGRATIONS.items():
+            print(f"  {name:<24} {migration.__doc__}")
+        sys.exit(1)
+    
+    asyncio.run(run(names))
+
+if __name__ == "__main__":
+    main()
@@ -10,6 +10,22 @@ class ProductCreate(BaseModel):
     price: float = Field(gt=0)
     sizes: List[SizeVariant]
 
+class ProductImportRow(ProductCreate):
+    sku: str = Field(min_length=1)
+
+class ProductImportError(BaseModel):
+    row: int
+    sku: Optional[str] = None
+    error: str
+
+class ProductImportResponse(BaseModel):
+    received: int
+    inserted: int
+    updated: int
+    failed: int
+    errors: List[ProductImportError]
+    errorsTruncated: bool = False
+
 class Product(BaseModel):
     id: Optional[str] = Field(default=None, alias="_id")
     name: str
@@ -29,6 +45,7 @@ class ProductCreateResponse(BaseModel):
 
 class OrderItem(BaseModel):
     productId: str
+    size: str
     qty: int = Field(gt=0)
 
 class OrderCreate(BaseModel):
@@ -38,6 +55,13 @@ class OrderCreate(BaseModel):
 class OrderCreateResponse(BaseModel):
     id: str
 
+class BulkOrderResult(BaseModel):
+    id: Optional[str] = None
+    error: Optional[str] = None
+
+class BulkOrderCreateResponse(BaseModel):
+    results: List[BulkOrderResult]
+
 class ProductDetails(BaseModel):
     name: str
     id: str
@@ -51,10 +75,20 @@ class OrderResponse(BaseModel):
     items: List[OrderItemResponse]
     total: float
 
+class OrderSummaryResponse(BaseModel):
+    userId: str
+    orderCount: int
+    totalSpent: float
+    firstOrderAt: Optional[str] = None
+    lastOrderAt: Optional[str] = None
+
 class PaginationMetadata(BaseModel):
     next: Optional[str] = None
     limit: int
     previous: Optional[str] = None
+    total: Optional[int] = None
+    nextCursor: Optional[str] = None
+    previousCursor: Optional[str] = None
 
 class ProductListResponse(BaseModel):
     data: List[ProductResponse]
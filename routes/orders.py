@@ -1,108 +1,400 @@
-from fastapi import APIRouter, HTTPException, Query, Path
-from typing import Optional
-from models import OrderCreate, OrderCreateResponse, OrderListResponse, OrderResponse, OrderItemResponse, ProductDetails, PaginationMetadata
-from database import get_database
-from utils.pagination import calculate_pagination
-from datetime import datetime
+from fastapi import APIRouter, HTTPException, Query, Path, Body, Header
+from fastapi.responses import ORJSONResponse
+from typing import List, Literal, Optional
+from models import OrderCreate, OrderCreateResponse, OrderListResponse, OrderSummaryResponse, BulkOrderCreateResponse
+from storage import ProductRepository, get_storage
+from utils.export import EXPORT_BATCH_SIZE, export_response, parse_document_id
+from utils.idempotency import idempotent_requests, request_fingerprint
+from utils.pagination import cursor_bounds, calculate_cursor_pagination, calculate_pagination
+from utils.product_cache import get_products
+from utils.request_timing import TimedRoute
+from datetime import datetime, timezone
+import asyncio
+import os
 
-router = APIRouter()
+router = APIRouter(route_class=TimedRoute)
+
+MAX_BULK_ORDERS = 10000
+BULK_RESERVATION_CONCURRENCY = 32
+# Stock reservations in flight at once for the lines of one order
+ORDER_LINE_CONCURRENCY = int(os.getenv("ORDER_LINE_CONCURRENCY", "8"))
+
+class InsufficientStockError(Exception):
+    """Raised when a size variant does not have enough stock for an order line"""
+
+def _stock_lines(items: list) -> dict:
+    """Sum order line quantities per (productId, size)"""
+    lines = {}
+    for item in items:
+        key = (item["productId"], item["size"])
+        lines[key] = lines.get(key, 0) + item["qty"]
+    return lines
+
+async def _release_stock(products: ProductRepository, lines: dict):
+    """Give reserved quantities back to their size variants"""
+    for (product_id, size), qty in lines.items():
+        await products.release_stock(product_id, size, qty)
+
+async def _reserve_stock(products: ProductRepository, items: list, concurrency: Optional[int] = None):
+    """Atomically decrement SizeVariant.quantity for every order line
+    
+    Each distinct (productId, size) line is an atomic conditional
+    decrement in the storage backend that only succeeds while the variant
+    still has enough stock, so concurrent orders across workers can never
+    drive a quantity below zero. Up to `concurrency` lines (default
+    ORDER_LINE_CONCURRENCY) are reserved at once. If any line fails, the
+    lines that were reserved are released and InsufficientStockError (or
+    the storage error) is raised.
+    """
+    lines = _stock_lines(items)
+    semaphore = asyncio.Semaphore(concurrency or ORDER_LINE_CONCURRENCY)
+    
+    async def reserve(product_id, size, qty) -> bool:
+        async with semaphore:
+            return await products.reserve_stock(product_id, size, qty)
+    
+    outcomes = await asyncio.gather(
+        *(reserve(product_id, size, qty) for (product_id, size), qty in lines.items()),
+        return_exceptions=True
+    )
+    if all(outcome is True for outcome in outcomes):
+        return
+    
+    await _release_stock(products, {
+        line: qty for (line, qty), outcome in zip(lines.items(), outcomes) if outcome is True
+    })
+    for (product_id, size), outcome in zip(lines, outcomes):
+        if isinstance(outcome, BaseException):
+            raise outcome
+        if not outcome:
+            raise InsufficientStockError(f"Insufficient stock for product {product_id} size {size}")
+
+def _to_paise(price: float) -> int:
+    """Price in whole paise; prices carry at most two decimals"""
+    return round(price * 100)
+
+def _build_order_document(order: OrderCreate, products_by_id: dict, created_at: str) -> dict:
+    """Price an order against pre-fetched products and build its document
+    
+    Raises LookupError naming the first product that is missing from
+    products_by_id.
+    """
+    # Sum in integer paise so totals carry no float rounding error
+    total_paise = 0
+    validated_items = []
+    
+    for item in order.items:
+        product = products_by_id.get(item.productId)
+        if not product:
+            raise LookupError(f"Product not found: {item.productId}")
+        
+        # Calculate item total
+        total_paise += _to_paise(product["price"]) * item.qty
+        
+        # Snapshot name and unit price so the order reads back as placed
+        validated_items.append({
+            "productId": item.productId,
+            "name": product["name"],
+            "unitPrice": product["price"],
+            "size": item.size,
+            "qty": item.qty
+        })
+    
+    return {
+        "userId": order.userId,
+        "items": validated_items,
+        "total": total_paise / 100,
+        "createdAt": created_at
+    }
+
+async def _place_order(order: OrderCreate) -> dict:
+    """Validate, price and store an order, reserving its stock"""
+    storage = get_storage()
+    
+    # Validate products exist
+    products_by_id = await get_products(item.productId for item in order.items)
+    for item in order.items:
+        if item.productId not in products_by_id:
+            raise HTTPException(status_code=404, detail=f"Product not found: {item.productId}")
+    
+    # Calculate total and create order document
+    order_doc = _build_order_document(order, products_by_id, datetime.utcnow().isoformat())
+    
+    # Reserve stock for every line before the order is written
+    try:
+        await _reserve_stock(storage.products, order_doc["items"])
+    except InsufficientStockError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    
+    # Insert order, giving the stock back if the write fails
+    try:
+        order_id = await storage.orders.insert(order_doc)
+    except Exception:
+        await _release_stock(storage.products, _stock_lines(order_doc["items"]))
+        raise
+    
+    return {"id": str(order_id)}
 
 @router.post("", response_model=OrderCreateResponse, status_code=201)
-async def create_order(order: OrderCreate):
-    """Create a new order"""
+async def create_order(
+    order: OrderCreate,
+    idempotency_key: Optional[str] = Header(
+        None, max_length=255, description="Retries with the same key return the first response instead of placing another order"
+    )
+):
+    """Create a new order
+    
+    With an Idempotency-Key header the order is placed at most once per
+    key: concurrent and later retries get the stored response (marked
+    with Idempotent-Replayed) without touching products or stock.
+    """
     try:
-        db = get_database()
+        if idempotency_key is None:
+            return OrderCreateResponse(**await _place_order(order))
         
-        # Validate products exist and calculate total
-        total_amount = 0.0
-        validated_items = []
+        response = await idempotent_requests.run(
+            idempotency_key,
+            request_fingerprint(order.model_dump()),
+            lambda: _place_order(order),
+            status_code=201
+        )
+        headers = {"Idempotent-Replayed": "true"} if response.replayed else None
+        return ORJSONResponse(content=response.body, status_code=response.status_code, headers=headers)
+    
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error creating order: {str(e)}")
+
+@router.post("/bulk", response_model=BulkOrderCreateResponse)
+async def create_orders_bulk(
+    orders: List[OrderCreate] = Body(..., min_length=1, max_length=MAX_BULK_ORDERS)
+):
+    """Create many orders at once, reporting an id or error for each order"""
+    try:
+        storage = get_storage()
         
-        for item in order.items:
-            # Find product by string ID
-            product = await db.products.find_one({"_id": item.productId})
-            if not product:
-                raise HTTPException(status_code=404, detail=f"Product not found: {item.productId}")
-            
-            # Calculate item total
-            item_total = product["price"] * item.qty
-            total_amount += item_total
-            
-            validated_items.append({
-                "productId": item.productId,
-                "qty": item.qty
-            })
+        # Resolve every distinct product through the cache in a single query
+        products_by_id = await get_products(item.productId for order in orders for item in order.items)
         
-        # Create order document
-        order_doc = {
-            "userId": order.userId,
-            "items": validated_items,
-            "total": total_amount,
-            "createdAt": datetime.utcnow().isoformat()
-        }
+        # Price all orders in memory
+        created_at = datetime.utcnow().isoformat()
+        results = [{"id": None, "error": None} for _ in orders]
+        order_docs = []
+        doc_positions = []
         
-        # Insert order
-        result = await db.orders.insert_one(order_doc)
+        for position, order in enumerate(orders):
+            try:
+                order_docs.append(_build_order_document(order, products_by_id, created_at))
+                doc_positions.append(position)
+            except LookupError as e:
+                results[position]["error"] = str(e)
         
-        return OrderCreateResponse(id=str(result.inserted_id))
+        # Reserve stock per order concurrently; each order is all-or-nothing
+        semaphore = asyncio.Semaphore(BULK_RESERVATION_CONCURRENCY)
+        
+        async def reserve(order_doc: dict) -> Optional[str]:
+            async with semaphore:
+                try:
+                    # Orders already run concurrently; reserve their lines one at a time
+                    await _reserve_stock(storage.products, order_doc["items"], concurrency=1)
+                    return None
+                except InsufficientStockError as e:
+                    return str(e)
+                except Exception as e:
+                    # _reserve_stock has released this order's lines; other
+                    # orders keep their reservations and are still written
+                    return f"Error reserving stock: {str(e)}"
+        
+        reservation_errors = await asyncio.gather(*(reserve(order_doc) for order_doc in order_docs))
+        
+        reserved_docs = []
+        reserved_positions = []
+        for position, order_doc, error in zip(doc_positions, order_docs, reservation_errors):
+            if error:
+                results[position]["error"] = error
+            else:
+                reserved_docs.append(order_doc)
+                reserved_positions.append(position)
+        order_docs, doc_positions = reserved_docs, reserved_positions
+        
+        # Insert the valid orders in one unordered batch, giving all their
+        # stock back if the write itself fails
+        write_errors = {}
+        if order_docs:
+            try:
+                write_errors = await storage.orders.insert_many(order_docs)
+            except Exception:
+                for order_doc in order_docs:
+                    await _release_stock(storage.products, _stock_lines(order_doc["items"]))
+                raise
+        
+        for index, (position, order_doc) in enumerate(zip(doc_positions, order_docs)):
+            if index in write_errors:
+                await _release_stock(storage.products, _stock_lines(order_doc["items"]))
+                results[position]["error"] = f"Error creating order: {write_errors[index]}"
+            else:
+                results[position]["id"] = str(order_doc["_id"])
+        
+        return ORJSONResponse(content={"results": results})
     
-    except HTTPException:
-        raise
     except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Error creating order: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Error creating orders: {str(e)}")
+
+ORDER_CSV_COLUMNS = ["id", "userId", "createdAt", "total", "productId", "name", "unitPrice", "size", "qty"]
+
+def _order_record(order: dict) -> dict:
+    return {
+        "id": str(order["_id"]),
+        "userId": order["userId"],
+        "items": order["items"],
+        "total": order["total"],
+        "createdAt": order.get("createdAt")
+    }
+
+def _order_csv_rows(order: dict) -> list:
+    # One row per order line
+    return [
+        [
+            str(order["_id"]), order["userId"], order.get("createdAt"), order["total"],
+            item["productId"], item.get("name"), item.get("unitPrice"), item.get("size"), item["qty"]
+        ]
+        for item in order["items"]
+    ]
+
+# Declared before /{user_id} so "export" is not taken for a user ID
+@router.get("/export")
+async def export_orders(
+    user_id: Optional[str] = Query(None, alias="userId", description="Only export this user's orders"),
+    since: Optional[datetime] = Query(None, description="Only export orders created at or after this time"),
+    export_format: Literal["ndjson", "csv"] = Query("ndjson", alias="format", description="Export format"),
+    after: Optional[str] = Query(None, description="Resume after this order id (the last id received)")
+):
+    """Stream orders in _id order as NDJSON or CSV"""
+    try:
+        # createdAt is stored as a naive UTC ISO timestamp
+        if since is not None and since.tzinfo is not None:
+            since = since.astimezone(timezone.utc).replace(tzinfo=None)
+        
+        orders = get_storage().orders.export(
+            user_id=user_id,
+            since=since.isoformat() if since is not None else None,
+            after_id=parse_document_id(after) if after else None,
+            batch_size=EXPORT_BATCH_SIZE
+        )
+        return export_response(
+            orders, export_format, "orders",
+            _order_record, ORDER_CSV_COLUMNS, _order_csv_rows
+        )
+    
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error exporting orders: {str(e)}")
 
 @router.get("/{user_id}", response_model=OrderListResponse)
 async def get_user_orders(
     user_id: str = Path(..., description="User ID to fetch orders for"),
     limit: int = Query(10, ge=1, le=100, description="Number of orders to return"),
-    offset: int = Query(0, ge=0, description="Number of orders to skip")
+    offset: int = Query(0, ge=0, description="Number of orders to skip"),
+    include_total: bool = Query(False, description="Also return the total number of orders"),
+    after: Optional[str] = Query(None, description="Cursor: return orders after this position"),
+    before: Optional[str] = Query(None, description="Cursor: return orders before this position")
 ):
-    """Get orders for a specific user with product details lookup"""
+    """Get orders for a specific user, served from the order line snapshots"""
     try:
-        db = get_database()
+        orders_repository = get_storage().orders
         
-        # Get all orders for the user
-        all_orders = db.orders.find({"userId": user_id})
-        orders_data = await all_orders.to_list(length=None)
-        
-        # Sort by _id (creation order)
-        orders_data.sort(key=lambda x: x["_id"])
-        
-        # Get total count for pagination
-        total_count = len(orders_data)
+        if after is not None or before is not None:
+            # Keyset mode: seek past the cursor on the (userId, _id) index
+            try:
+                after_id, before_id = cursor_bounds(after, before)
+            except ValueError as e:
+                raise HTTPException(status_code=400, detail=str(e))
+            
+            orders_data = await orders_repository.find_by_user(
+                user_id, limit + 1, after_id=after_id, before_id=before_id, descending=before is not None
+            )
+            paginated_orders, pagination = calculate_cursor_pagination(orders_data, limit, after, before)
+            
+            if include_total:
+                pagination.total = await orders_repository.count_by_user(user_id)
+        else:
+            # Fetch one page sorted by _id (creation order), plus one extra
+            # order to tell whether a next page exists
+            orders_data = await orders_repository.find_by_user(user_id, limit + 1, skip=offset)
+            paginated_orders = orders_data[:limit]
+            
+            # Only count the full order history when the client asks for it
+            if include_total:
+                total_count = await orders_repository.count_by_user(user_id)
+            else:
+                total_count = offset + len(orders_data)
+            
+            # Calculate pagination metadata
+            pagination = calculate_pagination(
+                offset, limit, total_count, len(paginated_orders),
+                include_total=include_total,
+                first_id=paginated_orders[0]["_id"] if paginated_orders else None,
+                last_id=paginated_orders[-1]["_id"] if paginated_orders else None
+            )
         
-        # Apply pagination
-        paginated_orders = orders_data[offset:offset + limit]
+        # Lines stored before snapshots existed still need a product lookup
+        products_by_id = await get_products(
+            item["productId"]
+            for order in paginated_orders
+            for item in order["items"]
+            if "name" not in item
+        )
         
-        # Convert to response format with product details lookup
+        # Convert to response format from the stored line snapshots, as
+        # plain dicts serialized once by orjson
         order_responses = []
         for order in paginated_orders:
             order_items = []
             
-            # Look up product details for each item
             for item in order["items"]:
-                product = await db.products.find_one({"_id": item["productId"]})
-                if product:
-                    order_items.append(OrderItemResponse(
-                        productDetails=ProductDetails(
-                            name=product["name"],
-                            id=product["_id"]
-                        ),
-                        qty=item["qty"]
-                    ))
+                name = item.get("name")
+                if name is None:
+                    product = products_by_id.get(item["productId"])
+                    if not product:
+                        continue
+                    name = product["name"]
+                
+                order_items.append({
+                    "productDetails": {"name": name, "id": item["productId"]},
+                    "qty": item["qty"]
+                })
             
-            order_responses.append(OrderResponse(
-                id=str(order["_id"]),
-                items=order_items,
-                total=order["total"]
-            ))
-        
-        # Calculate pagination metadata
-        pagination = calculate_pagination(offset, limit, total_count, len(order_responses))
-        
-        return OrderListResponse(
-            data=order_responses,
-            page=pagination
-        )
+            order_responses.append({
+                "id": str(order["_id"]),
+                "items": order_items,
+                "total": order["total"]
+            })
+        
+        return ORJSONResponse(content={
+            "data": order_responses,
+            "page": pagination.model_dump()
+        })
     
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error fetching orders: {str(e)}")
+
+@router.get("/{user_id}/summary", response_model=OrderSummaryResponse)
+async def get_user_order_summary(
+    user_id: str = Path(..., description="User ID to summarize orders for")
+):
+    """Get a user's order count and lifetime spend from one precomputed stats document"""
+    try:
+        stats = await get_storage().orders.summary(user_id) or {}
+        
+        return OrderSummaryResponse(
+            userId=user_id,
+            orderCount=stats.get("orderCount", 0),
+            totalSpent=stats.get("totalSpentPaise", 0) / 100,
+            firstOrderAt=stats.get("firstOrderAt"),
+            lastOrderAt=stats.get("lastOrderAt")
+        )
+    
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error fetching order summary: {str(e)}")
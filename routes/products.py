@@ -1,73 +1,234 @@
-from fastapi import APIRouter, HTTPException, Query
-from typing import Optional
-from models import ProductCreate, ProductCreateResponse, ProductListResponse, ProductResponse, PaginationMetadata
-from database import get_database
-from utils.pagination import calculate_pagination
-import re
+from fastapi import APIRouter, HTTPException, Query, Header, Request
+from fastapi.responses import ORJSONResponse
+from typing import Literal, Optional
+import orjson
+from models import ProductCreate, ProductCreateResponse, ProductImportResponse, ProductListResponse
+from storage import ProductQuery, get_storage
+from utils.count_cache import count_cache
+from utils.export import EXPORT_BATCH_SIZE, export_response, parse_document_id
+from utils.pagination import cursor_bounds, calculate_cursor_pagination, calculate_pagination
+from utils.product_cache import product_cache
+from utils.product_import import csv_records, import_product_rows, ndjson_records
+from utils.response_cache import response_cache, cached_json_response
+from utils.request_timing import TimedRoute, timed_phase
 
-router = APIRouter()
+router = APIRouter(route_class=TimedRoute)
 
 @router.post("", response_model=ProductCreateResponse, status_code=201)
 async def create_product(product: ProductCreate):
     """Create a new product"""
     try:
-        db = get_database()
-        
-        # Convert product to dict and insert
+        # Convert product to dict and insert, with a normalized name for
+        # index-friendly prefix search
         product_dict = product.dict()
-        result = await db.products.insert_one(product_dict)
+        product_dict["nameLower"] = product.name.lower()
+        product_id = await get_storage().products.insert(product_dict)
+        # Cached under the string ids orders refer to
+        product_cache.invalidate(str(product_id))
+        response_cache.bump("products")
         
-        return ProductCreateResponse(id=str(result.inserted_id))
+        return ProductCreateResponse(id=str(product_id))
     
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error creating product: {str(e)}")
 
+def resolve_match_mode(match: Optional[str]) -> str:
+    """Pick the name search mode: explicit, else a case-insensitive substring match
+    
+    prefix and text search are opt-in, so clients that omit `match` keep
+    the substring matching they had before those modes existed.
+    """
+    return match or "contains"
+
+async def _count_products(query: ProductQuery, count: str) -> int:
+    """Total number of matching products, exact or fast
+    
+    Fast totals come from collection metadata when nothing is filtered,
+    otherwise from counts cached for COUNT_CACHE_TTL_SECONDS.
+    """
+    products_repository = get_storage().products
+    
+    with timed_phase("count"):
+        if count == "exact":
+            return await products_repository.count(query)
+        if not query.filtered:
+            return await products_repository.estimated_count()
+        
+        cache_key = (query.name, query.match, query.size, query.in_stock)
+        return await count_cache.get(cache_key, lambda: products_repository.count(query))
+
+async def _find_products(
+    name: Optional[str],
+    match: Optional[str],
+    size: Optional[str],
+    in_stock: bool,
+    limit: int,
+    offset: int,
+    after: Optional[str],
+    before: Optional[str],
+    count: Optional[str] = None
+) -> dict:
+    """Query one page of products as a plain response dict
+    
+    Pages are fetched with one extra product to tell whether a next page
+    exists; `total` is only counted when count is "exact" or "fast".
+    """
+    products_repository = get_storage().products
+    # Products changed while the query runs must not be primed
+    cache_generation = product_cache.generation
+    
+    # Build the listing query
+    query = ProductQuery(
+        name=name,
+        match=resolve_match_mode(match) if name else "prefix",
+        size=size,
+        in_stock=in_stock
+    )
+    
+    if after is not None or before is not None:
+        if query.text_search:
+            raise HTTPException(status_code=400, detail="Cursor pagination is not supported with text search")
+        
+        # Keyset mode: seek past the cursor on the _id index
+        try:
+            query.after_id, query.before_id = cursor_bounds(after, before)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        
+        products = await products_repository.find(query, limit + 1, descending=before is not None)
+        products, pagination = calculate_cursor_pagination(products, limit, after, before)
+    else:
+        # Execute query with pagination, one product past the page
+        products = await products_repository.find(query, limit + 1, skip=offset)
+        fetched_count = len(products)
+        products = products[:limit]
+        
+        # Calculate pagination metadata; relevance-ordered text results
+        # have no _id cursors
+        keyset = bool(products) and not query.text_search
+        pagination = calculate_pagination(
+            offset, limit, offset + fetched_count, len(products),
+            first_id=products[0]["_id"] if keyset else None,
+            last_id=products[-1]["_id"] if keyset else None
+        )
+    
+    if count is not None:
+        pagination.total = await _count_products(query, count)
+    
+    # Keep the hot products warm for the order routes
+    product_cache.prime(products, cache_generation)
+    
+    # Convert to response format straight from the projection (exclude
+    # sizes from output)
+    product_responses = [
+        {"id": str(product["_id"]), "name": product["name"], "price": product["price"]}
+        for product in products
+    ]
+    
+    return {
+        "data": product_responses,
+        "page": pagination.model_dump()
+    }
+
 @router.get("", response_model=ProductListResponse)
 async def list_products(
-    name: Optional[str] = Query(None, description="Filter by product name (supports regex)"),
+    name: Optional[str] = Query(None, description="Filter by product name"),
+    match: Optional[Literal["prefix", "contains", "text"]] = Query(
+        None, description="Name search mode; defaults to contains (case-insensitive substring)"
+    ),
     size: Optional[str] = Query(None, description="Filter by size availability"),
+    in_stock: bool = Query(False, description="Only match size variants with quantity above zero"),
     limit: int = Query(10, ge=1, le=100, description="Number of products to return"),
-    offset: int = Query(0, ge=0, description="Number of products to skip")
+    offset: int = Query(0, ge=0, description="Number of products to skip"),
+    after: Optional[str] = Query(None, description="Cursor: return products after this position"),
+    before: Optional[str] = Query(None, description="Cursor: return products before this position"),
+    count: Optional[Literal["exact", "fast"]] = Query(
+        None, description="Include page.total: exact, or fast (estimated when unfiltered, briefly cached otherwise)"
+    ),
+    if_none_match: Optional[str] = Header(None)
 ):
-    """List products with optional filtering and pagination"""
+    """List products with optional filtering and pagination
+    
+    Serialized pages are cached briefly per filter and page, and carry a
+    strong ETag so clients holding a current copy get 304 Not Modified.
+    """
     try:
-        db = get_database()
-        
-        # Build query filter
-        query_filter = {}
-        
-        # Name filter with regex support
-        if name:
-            query_filter["name"] = {"$regex": re.escape(name), "$options": "i"}
+        cache_key = (name, match, size, in_stock, limit, offset, after, before, count)
+        cached = response_cache.get("products", cache_key)
         
-        # Size filter - check if any size variant matches
-        if size:
-            query_filter["sizes"] = {"$elemMatch": {"size": size}}
+        if cached is None:
+            page = await _find_products(name, match, size, in_stock, limit, offset, after, before, count)
+            with timed_phase("serialize"):
+                body = orjson.dumps(page)
+            cached = response_cache.set("products", cache_key, body)
         
-        # Get total count for pagination
-        total_count = await db.products.count_documents(query_filter)
-        
-        # Execute query with pagination
-        cursor = db.products.find(query_filter).skip(offset).limit(limit).sort("_id", 1)
-        products = await cursor.to_list(length=limit)
-        
-        # Convert to response format (exclude sizes from output)
-        product_responses = [
-            ProductResponse(
-                id=str(product["_id"]),
-                name=product["name"],
-                price=product["price"]
-            )
-            for product in products
-        ]
-        
-        # Calculate pagination metadata
-        pagination = calculate_pagination(offset, limit, total_count, len(product_responses))
-        
-        return ProductListResponse(
-            data=product_responses,
-            page=pagination
-        )
+        return cached_json_response(cached, if_none_match)
     
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error fetching products: {str(e)}")
+
+PRODUCT_CSV_COLUMNS = ["id", "sku", "name", "price", "sizes"]
+
+def _product_record(product: dict) -> dict:
+    return {
+        "id": str(product["_id"]),
+        "sku": product.get("sku"),
+        "name": product["name"],
+        "price": product["price"],
+        "sizes": product.get("sizes", [])
+    }
+
+def _product_csv_rows(product: dict) -> list:
+    # Size variants are packed into one column as size:quantity;...
+    sizes = ";".join(f"{variant['size']}:{variant['quantity']}" for variant in product.get("sizes", []))
+    return [[str(product["_id"]), product.get("sku"), product["name"], product["price"], sizes]]
+
+@router.get("/export")
+async def export_products(
+    export_format: Literal["ndjson", "csv"] = Query("ndjson", alias="format", description="Export format"),
+    after: Optional[str] = Query(None, description="Resume after this product id (the last id received)")
+):
+    """Stream the whole catalogue in _id order as NDJSON or CSV"""
+    try:
+        after_id = parse_document_id(after) if after else None
+        products = get_storage().products.export(after_id, batch_size=EXPORT_BATCH_SIZE)
+        return export_response(
+            products, export_format, "products",
+            _product_record, PRODUCT_CSV_COLUMNS, _product_csv_rows
+        )
+    
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error exporting products: {str(e)}")
+
+@router.post("/import", response_model=ProductImportResponse)
+async def import_products(
+    request: Request,
+    import_format: Optional[Literal["ndjson", "csv"]] = Query(
+        None, alias="format", description="Upload format; defaults to csv for a text/csv Content-Type, else ndjson"
+    )
+):
+    """Insert or update products by SKU from a streamed NDJSON or CSV upload
+    
+    The body is parsed as it arrives and written with unordered bulk
+    upserts, so uploads of any size use bounded memory. Rows that fail to
+    parse, validate or write are listed in the response; the others are
+    stored.
+    """
+    if import_format is None:
+        import_format = "csv" if "csv" in request.headers.get("content-type", "") else "ndjson"
+    parse = csv_records if import_format == "csv" else ndjson_records
+    
+    try:
+        report = await import_product_rows(parse(request.stream()), get_storage().products)
+        return ORJSONResponse(content=report)
+    
+    except UnicodeDecodeError:
+        raise HTTPException(status_code=400, detail="Upload must be UTF-8 encoded")
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error importing products: {str(e)}")
+    finally:
+        # Names and prices may have changed for any imported SKU
+        product_cache.clear()
+        response_cache.bump("products")
@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+"""
+Production server launcher for FastAPI Ecommerce Backend
+
+Runs WEB_CONCURRENCY uvicorn workers (default: one per available CPU)
+on uvloop and httptools when they are installed. MongoDB indexes are
+created once here, alongside worker startup rather than before it,
+instead of by every worker, and static files are precompressed.
+"""
+
+from dotenv import load_dotenv
+load_dotenv()
+import asyncio
+import importlib.util
+import logging
+import os
+import shutil
+import tempfile
+import threading
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger("run_production")
+
+def available_cpus() -> int:
+    """CPUs this process may run on (respects affinity / container cpusets)"""
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return os.cpu_count() or 1
+
+def fastest_available(candidates: list, fallback: str) -> str:
+    """First installed module among candidates, else fallback"""
+    for module in candidates:
+        if importlib.util.find_spec(module) is not None:
+            return module
+    return fallback
+
+async def create_indexes():
+    """Create indexes through a private client
+
+    database.mongodb belongs to the worker, which runs in this process
+    when there is only one, so it is never touched here.
+    """
+    import database
+    mongodb_url = os.getenv("MONGODB_URL")
+    if not mongodb_url:
+        raise Exception("MONGODB_URL environment variable is required")
+
+    client = database.create_client(mongodb_url)
+    try:
+        await database.create_indexes(client[os.getenv("DATABASE_NAME", "ecommerce")])
+    finally:
+        client.close()
+
+def create_indexes_in_background() -> threading.Thread:
+    """Create indexes on a daemon thread while the workers boot"""
+    def run():
+        try:
+            asyncio.run(create_indexes())
+        except Exception as e:
+            logger.error(f"Could not create indexes: {e}")
+
+    thread = threading.Thread(target=run, name="create-indexes", daemon=True)
+    thread.start()
+    return thread
+
+def main():
+    """Start the multi-worker production server"""
+    import uvicorn
+
+    workers = int(os.getenv("WEB_CONCURRENCY", str(available_cpus())))
+    loop = fastest_available(["uvloop"], "asyncio")
+    http = fastest_available(["httptools"], "h11")
+
+    # Compressed copies of the web interface, served to clients that accept them
+    from utils.compression import precompress_directory
+    precompress_directory(os.path.join(os.path.dirname(os.path.abspath(__file__)), "static"))
+
+    # Metrics from every worker are aggregated through a shared directory,
+    # which must start empty
+    metrics_dir = None
+    if workers > 1 and not os.getenv("PROMETHEUS_MULTIPROC_DIR"):
+        metrics_dir = tempfile.mkdtemp(prefix="prometheus-")
+        os.environ["PROMETHEUS_MULTIPROC_DIR"] = metrics_dir
+
+    # Workers connect and warm their pools in the background, but skip
+    # index creation; `python migrations.py create_indexes` does the same
+    # as a deploy step
+    if os.getenv("STORAGE_BACKEND", "mongo") == "mongo":
+        if os.getenv("MONGODB_CREATE_INDEXES", "true").lower() == "true":
+            create_indexes_in_background()
+        os.environ["MONGODB_CREATE_INDEXES"] = "false"
+
+    logger.info(f"Starting {workers} workers (loop={loop}, http={http})")
+    try:
+        uvicorn.run(
+            "main:app",
+            host=os.getenv("HOST", "0.0.0.0"),
+            port=int(os.getenv("PORT", "8000")),
+            workers=workers,
+            loop=loop,
+            http=http,
+            proxy_headers=True,
+            forwarded_allow_ips=os.getenv("FORWARDED_ALLOW_IPS", "127.0.0.1"),
+            timeout_keep_alive=int(os.getenv("KEEP_ALIVE_SECONDS", "5")),
+            timeout_graceful_shutdown=int(os.getenv("GRACEFUL_SHUTDOWN_SECONDS", "30")),
+            access_log=os.getenv("ACCESS_LOG", "false").lower() == "true",
+            log_level="info"
+        )
+    finally:
+        if metrics_dir:
+            shutil.rmtree(metrics_dir, ignore_errors=True)
+
+if __name__ == "__main__":
+    main()
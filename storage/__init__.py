@@ -0,0 +1,64 @@
+"""
+Storage backends
+
+The routes talk to products and orders through the repositories of the
+active backend, selected with the STORAGE_BACKEND environment variable:
+`mongo` (default) or `memory`.
+"""
+
+import os
+import logging
+from typing import Optional
+from storage.base import IdempotencyRepository, OrderRepository, ProductQuery, ProductRepository, Storage, UpsertResult
+
+__all__ = [
+    "IdempotencyRepository",
+    "OrderRepository",
+    "ProductQuery",
+    "ProductRepository",
+    "Storage",
+    "UpsertResult",
+    "init_storage",
+    "set_storage",
+    "get_storage",
+    "close_storage",
+]
+
+logger = logging.getLogger(__name__)
+
+_storage: Optional[Storage] = None
+
+async def init_storage() -> Storage:
+    """Create the backend named by STORAGE_BACKEND"""
+    backend = os.getenv("STORAGE_BACKEND", "mongo")
+    
+    if backend == "mongo":
+        from storage.mongo import MongoStorage
+        storage = await MongoStorage.connect()
+    elif backend == "memory":
+        from storage.memory import MemoryStorage
+        storage = MemoryStorage()
+    else:
+        raise Exception(f"Unknown STORAGE_BACKEND '{backend}', expected 'mongo' or 'memory'")
+    
+    logger.info(f"Using {storage.name} storage backend")
+    set_storage(storage)
+    return storage
+
+def set_storage(storage: Storage):
+    """Install a storage backend"""
+    global _storage
+    _storage = storage
+
+def get_storage() -> Storage:
+    """Get the active storage backend"""
+    if _storage is None:
+        raise Exception("Storage not initialized. Call init_storage() first.")
+    return _storage
+
+async def close_storage():
+    """Close the active storage backend"""
+    global _storage
+    if _storage is not None:
+        await _storage.close()
+        _storage = None
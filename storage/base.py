@@ -0,0 +1,182 @@
+from abc import ABC, abstractmethod
+from dataclasses import dataclass, field
+from typing import Any, AsyncIterator, Dict, List, Optional
+from utils.export import parse_document_id
+
+def product_document_id(product_id: Any) -> Any:
+    """The stored _id for a product id given as a string (e.g. OrderItem.productId)"""
+    return parse_document_id(product_id) if isinstance(product_id, str) else product_id
+
+@dataclass
+class ProductQuery:
+    """Backend-neutral product listing filter
+
+    `match` is the resolved name search mode (prefix, contains or text).
+    `after_id` / `before_id` are exclusive _id bounds used by keyset
+    pagination.
+    """
+    name: Optional[str] = None
+    match: str = "prefix"
+    size: Optional[str] = None
+    in_stock: bool = False
+    after_id: Any = None
+    before_id: Any = None
+
+    @property
+    def text_search(self) -> bool:
+        return bool(self.name) and self.match == "text"
+
+    @property
+    def filtered(self) -> bool:
+        return bool(self.name or self.size) or self.in_stock
+
+@dataclass
+class UpsertResult:
+    """Outcome of a batch of upserts; errors maps batch index to message"""
+    inserted: int = 0
+    updated: int = 0
+    errors: Dict[int, str] = field(default_factory=dict)
+
+class ProductRepository(ABC):
+    """Product storage operations used by the routes"""
+
+    @abstractmethod
+    async def insert(self, product: dict) -> Any:
+        """Store a product and return its id"""
+
+    @abstractmethod
+    async def upsert_many(self, products: List[dict]) -> UpsertResult:
+        """Insert or update products keyed by `sku`, without stopping at failures
+
+        Name, price and sizes (including stock levels) of an existing
+        product are replaced. SKUs must be distinct within one call.
+        """
+
+    @abstractmethod
+    async def get_many(self, product_ids: List[Any]) -> Dict[Any, dict]:
+        """Fetch _id, name and price for the given ids, keyed by id as given
+
+        Ids are normalized with product_document_id, as are those passed to
+        reserve_stock and release_stock.
+        """
+
+    @abstractmethod
+    async def find(self, query: ProductQuery, limit: int, skip: int = 0, descending: bool = False) -> List[dict]:
+        """Fetch products with at least _id, name and price
+
+        Ordered by _id, or by relevance then _id for text search.
+        """
+
+    @abstractmethod
+    async def count(self, query: ProductQuery) -> int:
+        """Count the products matching a query"""
+
+    @abstractmethod
+    async def estimated_count(self) -> int:
+        """Approximate number of products, from collection metadata"""
+
+    @abstractmethod
+    async def reserve_stock(self, product_id: Any, size: str, qty: int) -> bool:
+        """Atomically take qty from a size variant if it has enough stock"""
+
+    @abstractmethod
+    async def release_stock(self, product_id: Any, size: str, qty: int):
+        """Give qty back to a size variant"""
+
+    @abstractmethod
+    def export(self, after_id: Any = None, batch_size: int = 1000) -> AsyncIterator[dict]:
+        """Iterate every product (_id, sku, name, price, sizes) in _id order after after_id
+
+        Products are fetched batch_size at a time, so memory use does not
+        grow with the collection.
+        """
+
+class OrderRepository(ABC):
+    """Order storage operations used by the routes"""
+
+    @abstractmethod
+    async def insert(self, order: dict) -> Any:
+        """Store an order and return its id"""
+
+    @abstractmethod
+    async def insert_many(self, orders: List[dict]) -> Dict[int, str]:
+        """Store orders without stopping at failures
+
+        Every order gets its `_id` set. Returns an error message per failed
+        index.
+        """
+
+    @abstractmethod
+    async def find_by_user(
+        self,
+        user_id: str,
+        limit: int,
+        skip: int = 0,
+        after_id: Any = None,
+        before_id: Any = None,
+        descending: bool = False
+    ) -> List[dict]:
+        """Fetch a user's orders by _id with _id, items and total"""
+
+    @abstractmethod
+    async def count_by_user(self, user_id: str) -> int:
+        """Count a user's orders"""
+
+    @abstractmethod
+    async def summary(self, user_id: str) -> Optional[dict]:
+        """Fetch a user's order stats: orderCount, totalSpentPaise, firstOrderAt, lastOrderAt
+
+        The stats are maintained by insert and insert_many.
+        """
+
+    @abstractmethod
+    def export(
+        self,
+        user_id: Optional[str] = None,
+        since: Optional[str] = None,
+        after_id: Any = None,
+        batch_size: int = 1000
+    ) -> AsyncIterator[dict]:
+        """Iterate full orders in _id order after after_id, batch_size at a time
+
+        Optionally limited to one user and to orders created at or after
+        `since` (an ISO timestamp, compared against createdAt).
+        """
+
+class IdempotencyRepository(ABC):
+    """Idempotency-Key records: one per key, expiring after a TTL
+
+    A record is `pending` while the request that claimed it runs, then
+    `completed` with the stored statusCode and response body.
+    """
+
+    @abstractmethod
+    async def claim(self, key: str, fingerprint: str, lock_seconds: float, ttl_seconds: float) -> Optional[dict]:
+        """Create a pending record for key and return None, or return the existing record
+
+        A pending record with the same fingerprint whose lock has expired
+        (its owner died) is taken over, which also returns None.
+        """
+
+    @abstractmethod
+    async def complete(self, key: str, status_code: int, body: dict):
+        """Store the response of a claimed key"""
+
+    @abstractmethod
+    async def release(self, key: str):
+        """Drop a pending record so the request can be retried"""
+
+class Storage:
+    """A storage backend: one repository per collection"""
+
+    name: str
+    products: ProductRepository
+    orders: OrderRepository
+    idempotency: IdempotencyRepository
+
+    async def health(self, timeout: float) -> dict:
+        """Check that the backend can serve requests"""
+        return {"status": "healthy", "database": self.name}
+
+    async def close(self):
+        """Release backend resources"""
@@ -0,0 +1,447 @@
+import bisect
+import re
+import time
+from collections import defaultdict
+from itertools import islice
+from typing import Any, AsyncIterator, Dict, Iterator, List, Optional, Set
+from bson import ObjectId
+from storage.base import IdempotencyRepository, OrderRepository, ProductQuery, ProductRepository, Storage, UpsertResult, product_document_id
+
+# Mirrors the BSON comparison order of the _id types this API produces
+_TYPE_ORDER = {int: 1, float: 1, str: 2, ObjectId: 7}
+_TRIE_IDS = ""
+
+def _id_key(value: Any) -> tuple:
+    # ObjectIds order like their 12 bytes; comparing bytes avoids the
+    # Python-level ObjectId comparison methods
+    if type(value) is ObjectId:
+        return (7, value.binary)
+    return (_TYPE_ORDER.get(type(value), 99), value)
+
+def _tokens(text: str) -> List[str]:
+    return re.findall(r"\w+", text.lower())
+
+class _SortedIds:
+    """_id values kept in sorted order for range scans"""
+
+    def __init__(self):
+        self._keys: List[tuple] = []
+        self._values: List[Any] = []
+
+    def add(self, value: Any):
+        key = _id_key(value)
+        position = bisect.bisect_right(self._keys, key)
+        self._keys.insert(position, key)
+        self._values.insert(position, value)
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def scan(self, after_id: Any = None, before_id: Any = None, descending: bool = False) -> Iterator[Any]:
+        """Iterate ids strictly between the bounds, starting at the right end"""
+        low = bisect.bisect_right(self._keys, _id_key(after_id)) if after_id is not None else 0
+        high = bisect.bisect_left(self._keys, _id_key(before_id)) if before_id is not None else len(self._keys)
+        positions = range(high - 1, low - 1, -1) if descending else range(low, high)
+        for position in positions:
+            yield self._values[position]
+
+def _batched_scan(ids: "_SortedIds", after_id: Any, batch_size: int) -> Iterator[List[Any]]:
+    """Yield ids after after_id in batches, seeking afresh for each batch
+
+    Each batch is taken in one step, so writes made between batches
+    cannot shift the scan.
+    """
+    while True:
+        batch = list(islice(ids.scan(after_id), batch_size))
+        if not batch:
+            return
+        yield batch
+        after_id = batch[-1]
+
+class _PrefixTrie:
+    """Character trie mapping name prefixes to product ids"""
+
+    def __init__(self):
+        self._root: dict = {}
+
+    def add(self, key: str, value: Any):
+        node = self._root
+        for char in key:
+            node = node.setdefault(char, {})
+        node.setdefault(_TRIE_IDS, set()).add(value)
+
+    def remove(self, key: str, value: Any):
+        node = self._root
+        for char in key:
+            node = node.get(char)
+            if node is None:
+                return
+        node.get(_TRIE_IDS, set()).discard(value)
+
+    def search(self, prefix: str) -> Set[Any]:
+        node = self._root
+        for char in prefix:
+            node = node.get(char)
+            if node is None:
+                return set()
+
+        found = set()
+        stack = [node]
+        while stack:
+            node = stack.pop()
+            for char, child in node.items():
+                if char == _TRIE_IDS:
+                    found |= child
+                else:
+                    stack.append(child)
+        return found
+
+class MemoryProductRepository(ProductRepository):
+    """Products in a dict with secondary indexes
+
+    Every method finishes without awaiting, so each call is atomic on the
+    event loop and stock reservations need no locks.
+    """
+
+    def __init__(self):
+        self._products: Dict[Any, dict] = {}
+        self._ids = _SortedIds()
+        self._by_sku: Dict[str, Any] = {}
+        self._name_trie = _PrefixTrie()
+        self._name_tokens: Dict[str, Set[Any]] = defaultdict(set)
+        self._by_size: Dict[str, Set[Any]] = defaultdict(set)
+
+    async def insert(self, product: dict) -> Any:
+        product_id = product.setdefault("_id", ObjectId())
+        if product_id in self._products:
+            raise ValueError(f"Duplicate product id: {product_id}")
+        if product.get("sku") is not None and product["sku"] in self._by_sku:
+            raise ValueError(f"Duplicate sku: {product['sku']}")
+
+        stored = {**product, "sizes": [dict(variant) for variant in product.get("sizes", [])]}
+        self._products[product_id] = stored
+        self._ids.add(product_id)
+        if stored.get("sku") is not None:
+            self._by_sku[stored["sku"]] = product_id
+        self._index(product_id, stored)
+
+        return product_id
+
+    async def upsert_many(self, products: List[dict]) -> UpsertResult:
+        result = UpsertResult()
+        for index, product in enumerate(products):
+            product_id = self._by_sku.get(product["sku"])
+            if product_id is None:
+                try:
+                    await self.insert(product)
+                    result.inserted += 1
+                except ValueError as e:
+                    result.errors[index] = str(e)
+                continue
+
+            stored = self._products[product_id]
+            self._unindex(product_id, stored)
+            for field in ("name", "nameLower", "price"):
+                stored[field] = product[field]
+            stored["sizes"] = [dict(variant) for variant in product["sizes"]]
+            self._index(product_id, stored)
+            result.updated += 1
+        return result
+
+    async def get_many(self, product_ids: List[Any]) -> Dict[Any, dict]:
+        products = {}
+        for product_id in product_ids:
+            product = self._products.get(product_document_id(product_id))
+            if product is not None:
+                products[product_id] = self._summary(product)
+        return products
+
+    async def find(self, query: ProductQuery, limit: int, skip: int = 0, descending: bool = False) -> List[dict]:
+        candidates, scores = self._candidates(query)
+
+        if query.text_search:
+            ordered = sorted(candidates, key=lambda product_id: (-scores[product_id], _id_key(product_id)))
+        elif candidates is None:
+            ordered = self._ids.scan(query.after_id, query.before_id, descending)
+        else:
+            ordered = sorted(
+                (product_id for product_id in candidates if self._in_bounds(product_id, query)),
+                key=_id_key,
+                reverse=descending
+            )
+
+        matches = (product_id for product_id in ordered if self._variant_matches(self._products[product_id], query))
+        page = []
+        for product_id in islice(matches, skip, skip + limit):
+            product = self._summary(self._products[product_id])
+            if query.text_search:
+                product["score"] = scores[product_id]
+            page.append(product)
+        return page
+
+    async def count(self, query: ProductQuery) -> int:
+        candidates, _ = self._candidates(query)
+        product_ids = self._products if candidates is None else candidates
+        return sum(1 for product_id in product_ids if self._variant_matches(self._products[product_id], query))
+
+    async def estimated_count(self) -> int:
+        return len(self._products)
+
+    async def reserve_stock(self, product_id: Any, size: str, qty: int) -> bool:
+        product = self._products.get(product_document_id(product_id))
+        if product is None:
+            return False
+        for variant in product["sizes"]:
+            if variant["size"] == size and variant["quantity"] >= qty:
+                variant["quantity"] -= qty
+                return True
+        return False
+
+    async def release_stock(self, product_id: Any, size: str, qty: int):
+        product = self._products.get(product_document_id(product_id))
+        if product is None:
+            return
+        for variant in product["sizes"]:
+            if variant["size"] == size:
+                variant["quantity"] += qty
+                return
+
+    async def export(self, after_id: Any = None, batch_size: int = 1000) -> AsyncIterator[dict]:
+        for batch in _batched_scan(self._ids, after_id, batch_size):
+            products = [self._export(self._products[product_id]) for product_id in batch]
+            for product in products:
+                yield product
+
+    def _index(self, product_id: Any, product: dict):
+        """Add a product to the name, token and size indexes"""
+        name_lower = product.get("nameLower") or product["name"].lower()
+        self._name_trie.add(name_lower, product_id)
+        for token in _tokens(name_lower):
+            self._name_tokens[token].add(product_id)
+        for variant in product["sizes"]:
+            self._by_size[variant["size"]].add(product_id)
+
+    def _unindex(self, product_id: Any, product: dict):
+        """Remove a product from the name, token and size indexes"""
+        name_lower = product.get("nameLower") or product["name"].lower()
+        self._name_trie.remove(name_lower, product_id)
+        for token in _tokens(name_lower):
+            self._name_tokens[token].discard(product_id)
+        for variant in product["sizes"]:
+            self._by_size[variant["size"]].discard(product_id)
+
+    @staticmethod
+    def _summary(product: dict) -> dict:
+        return {"_id": product["_id"], "name": product["name"], "price": product["price"]}
+
+    @staticmethod
+    def _export(product: dict) -> dict:
+        return {
+            "_id": product["_id"],
+            "sku": product.get("sku"),
+            "name": product["name"],
+            "price": product["price"],
+            "sizes": [dict(variant) for variant in product["sizes"]],
+        }
+
+    def _candidates(self, query: ProductQuery):
+        """Ids narrowed by the name and size indexes (None = all) and text scores"""
+        candidates: Optional[Set[Any]] = None
+        scores: Dict[Any, int] = {}
+
+        if query.name:
+            if query.match == "text":
+                for token in set(_tokens(query.name)):
+                    for product_id in self._name_tokens.get(token, ()):
+                        scores[product_id] = scores.get(product_id, 0) + 1
+                candidates = set(scores)
+            elif query.match == "contains":
+                needle = query.name.lower()
+                candidates = {
+                    product_id for product_id, product in self._products.items()
+                    if needle in product["name"].lower()
+                }
+            else:
+                candidates = self._name_trie.search(query.name.lower())
+
+        if query.size:
+            sized = self._by_size.get(query.size, set())
+            candidates = sized if candidates is None else candidates & sized
+
+        return candidates, scores
+
+    @staticmethod
+    def _in_bounds(product_id: Any, query: ProductQuery) -> bool:
+        key = _id_key(product_id)
+        if query.after_id is not None and key <= _id_key(query.after_id):
+            return False
+        if query.before_id is not None and key >= _id_key(query.before_id):
+            return False
+        return True
+
+    @staticmethod
+    def _variant_matches(product: dict, query: ProductQuery) -> bool:
+        """Size and stock conditions must hold on the same variant"""
+        if not query.size and not query.in_stock:
+            return True
+        return any(
+            (not query.size or variant["size"] == query.size)
+            and (not query.in_stock or variant["quantity"] > 0)
+            for variant in product["sizes"]
+        )
+
+class MemoryOrderRepository(OrderRepository):
+    """Orders in a dict with a userId -> sorted order ids index and per-user stats"""
+
+    def __init__(self):
+        self._orders: Dict[Any, dict] = {}
+        self._ids = _SortedIds()
+        self._by_user: Dict[str, _SortedIds] = defaultdict(_SortedIds)
+        self._stats: Dict[str, dict] = {}
+
+    async def insert(self, order: dict) -> Any:
+        order_id = order.setdefault("_id", ObjectId())
+        if order_id in self._orders:
+            raise ValueError(f"Duplicate order id: {order_id}")
+
+        self._orders[order_id] = {**order, "items": [dict(item) for item in order["items"]]}
+        self._ids.add(order_id)
+        self._by_user[order["userId"]].add(order_id)
+        self._record_stats(order)
+        return order_id
+
+    def _record_stats(self, order: dict):
+        stats = self._stats.setdefault(order["userId"], {"_id": order["userId"], "orderCount": 0, "totalSpentPaise": 0})
+        stats["orderCount"] += 1
+        stats["totalSpentPaise"] += round(order["total"] * 100)
+        created_at = order.get("createdAt")
+        if created_at:
+            stats["firstOrderAt"] = min(stats.get("firstOrderAt", created_at), created_at)
+            stats["lastOrderAt"] = max(stats.get("lastOrderAt", created_at), created_at)
+
+    async def insert_many(self, orders: List[dict]) -> Dict[int, str]:
+        errors = {}
+        for index, order in enumerate(orders):
+            try:
+                await self.insert(order)
+            except ValueError as e:
+                errors[index] = str(e)
+        return errors
+
+    async def find_by_user(
+        self,
+        user_id: str,
+        limit: int,
+        skip: int = 0,
+        after_id: Any = None,
+        before_id: Any = None,
+        descending: bool = False
+    ) -> List[dict]:
+        order_ids = self._by_user.get(user_id)
+        if order_ids is None:
+            return []
+        page = islice(order_ids.scan(after_id, before_id, descending), skip, skip + limit)
+        return [self._summary(self._orders[order_id]) for order_id in page]
+
+    async def count_by_user(self, user_id: str) -> int:
+        order_ids = self._by_user.get(user_id)
+        return len(order_ids) if order_ids is not None else 0
+
+    async def summary(self, user_id: str) -> Optional[dict]:
+        stats = self._stats.get(user_id)
+        return dict(stats) if stats is not None else None
+
+    async def export(
+        self,
+        user_id: Optional[str] = None,
+        since: Optional[str] = None,
+        after_id: Any = None,
+        batch_size: int = 1000
+    ) -> AsyncIterator[dict]:
+        order_ids = self._ids if user_id is None else self._by_user.get(user_id)
+        if order_ids is None:
+            return
+        
+        for batch in _batched_scan(order_ids, after_id, batch_size):
+            orders = [
+                self._export(self._orders[order_id]) for order_id in batch
+                if since is None or self._orders[order_id].get("createdAt", "") >= since
+            ]
+            for order in orders:
+                yield order
+
+    @staticmethod
+    def _summary(order: dict) -> dict:
+        return {
+            "_id": order["_id"],
+            "items": [
+                {key: item[key] for key in ("productId", "name", "qty") if key in item}
+                for item in order["items"]
+            ],
+            "total": order["total"],
+        }
+
+    @staticmethod
+    def _export(order: dict) -> dict:
+        return {
+            "_id": order["_id"],
+            "userId": order["userId"],
+            "items": [dict(item) for item in order["items"]],
+            "total": order["total"],
+            "createdAt": order.get("createdAt"),
+        }
+
+class MemoryIdempotencyRepository(IdempotencyRepository):
+    """Idempotency records in a dict, expired lazily on access"""
+
+    def __init__(self):
+        self._records: Dict[str, dict] = {}
+
+    def _live(self, key: str) -> Optional[dict]:
+        record = self._records.get(key)
+        if record is not None and record["expiresAt"] <= time.monotonic():
+            del self._records[key]
+            return None
+        return record
+
+    async def claim(self, key: str, fingerprint: str, lock_seconds: float, ttl_seconds: float) -> Optional[dict]:
+        now = time.monotonic()
+        record = self._live(key)
+        if record is None:
+            self._records[key] = {
+                "_id": key,
+                "fingerprint": fingerprint,
+                "status": "pending",
+                "lockedUntil": now + lock_seconds,
+                "expiresAt": now + ttl_seconds,
+            }
+            return None
+
+        if record["status"] == "pending" and record["fingerprint"] == fingerprint and record["lockedUntil"] <= now:
+            record["lockedUntil"] = now + lock_seconds
+            return None
+        return dict(record)
+
+    async def complete(self, key: str, status_code: int, body: dict):
+        record = self._records.get(key)
+        if record is not None:
+            record.update(status="completed", statusCode=status_code, response=body)
+
+    async def release(self, key: str):
+        record = self._records.get(key)
+        if record is not None and record["status"] == "pending":
+            del self._records[key]
+
+class MemoryStorage(Storage):
+    """In-process storage backend for local benchmarks and tests
+
+    Data lives only as long as the process and is not shared between
+    workers.
+    """
+
+    name = "memory"
+
+    def __init__(self):
+        self.products = MemoryProductRepository()
+        self.orders = MemoryOrderRepository()
+        self.idempotency = MemoryIdempotencyRepository()
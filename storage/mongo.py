@@ -0,0 +1,313 @@
+import logging
+import re
+from datetime import datetime, timedelta
+from typing import Any, AsyncIterator, Dict, List, Optional
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError, DuplicateKeyError
+from database import connect_to_mongodb, close_mongodb_connection, check_database_health, get_database, get_product_read_database
+from storage.base import IdempotencyRepository, OrderRepository, ProductQuery, ProductRepository, Storage, UpsertResult, product_document_id
+
+PRODUCT_LIST_PROJECTION = {"name": 1, "price": 1}
+ORDER_LIST_PROJECTION = {"items.productId": 1, "items.name": 1, "items.qty": 1, "total": 1}
+PRODUCT_EXPORT_PROJECTION = {"sku": 1, "name": 1, "price": 1, "sizes": 1}
+ORDER_EXPORT_PROJECTION = {"userId": 1, "items": 1, "total": 1, "createdAt": 1}
+
+logger = logging.getLogger(__name__)
+
+def build_name_filter(name: str, match: str) -> dict:
+    """Build the query filter for a name search mode"""
+    if match == "text":
+        return {"$text": {"$search": name}}
+    if match == "contains":
+        # Unanchored and case-insensitive: always a collection scan
+        return {"name": {"$regex": re.escape(name), "$options": "i"}}
+    # Anchored, case-sensitive regex on the normalized name: an index range scan
+    return {"nameLower": {"$regex": "^" + re.escape(name.lower())}}
+
+def build_product_filter(query: ProductQuery) -> dict:
+    """Build the products query filter for a listing query"""
+    query_filter = {}
+    
+    # Name filter in the selected search mode
+    if query.name:
+        query_filter.update(build_name_filter(query.name, query.match))
+    
+    # Size filter - a single $elemMatch on the (sizes.size, sizes.quantity)
+    # multikey index, so size and stock are checked on the same variant
+    variant_filter = {}
+    if query.size:
+        variant_filter["size"] = query.size
+    if query.in_stock:
+        variant_filter["quantity"] = {"$gt": 0}
+    if variant_filter:
+        query_filter["sizes"] = {"$elemMatch": variant_filter}
+    
+    return query_filter
+
+def user_stats_updates(orders: List[dict]) -> Dict[str, dict]:
+    """The user_order_stats update ($inc, $min, $max) per user for newly stored orders"""
+    stats: Dict[str, dict] = {}
+    for order in orders:
+        user_stats = stats.setdefault(order["userId"], {"count": 0, "paise": 0, "created": []})
+        user_stats["count"] += 1
+        user_stats["paise"] += round(order["total"] * 100)
+        if order.get("createdAt"):
+            user_stats["created"].append(order["createdAt"])
+    
+    updates = {}
+    for user_id, user_stats in stats.items():
+        update = {"$inc": {"orderCount": user_stats["count"], "totalSpentPaise": user_stats["paise"]}}
+        if user_stats["created"]:
+            update["$min"] = {"firstOrderAt": min(user_stats["created"])}
+            update["$max"] = {"lastOrderAt": max(user_stats["created"])}
+        updates[user_id] = update
+    return updates
+
+async def apply_user_stats(collection, orders: List[dict]):
+    """Upsert the stats of orders into collection: one update_one, or one bulk_write for several users"""
+    updates = user_stats_updates(orders)
+    if len(updates) == 1:
+        [(user_id, update)] = updates.items()
+        await collection.update_one({"_id": user_id}, update, upsert=True)
+    elif updates:
+        await collection.bulk_write(
+            [UpdateOne({"_id": user_id}, update, upsert=True) for user_id, update in updates.items()],
+            ordered=False
+        )
+
+async def _record_user_stats(orders: List[dict]):
+    """Add stored orders to the per-user stats; a failure only logs, the orders stand"""
+    try:
+        await apply_user_stats(get_database().user_order_stats, orders)
+    except Exception as e:
+        logger.warning(f"Could not update user_order_stats, run rebuild_user_order_stats: {e}")
+
+def _id_range(after_id: Any, before_id: Any) -> dict:
+    """Exclusive _id bounds for keyset pagination"""
+    bounds = {}
+    if after_id is not None:
+        bounds["$gt"] = after_id
+    if before_id is not None:
+        bounds["$lt"] = before_id
+    return {"_id": bounds} if bounds else {}
+
+class MongoProductRepository(ProductRepository):
+    async def insert(self, product: dict) -> Any:
+        result = await get_database().products.insert_one(product)
+        return result.inserted_id
+
+    async def upsert_many(self, products: List[dict]) -> UpsertResult:
+        # One unordered bulk_write keyed by the unique sku index; a failed
+        # row does not stop the rest of the batch
+        operations = [
+            UpdateOne(
+                {"sku": product["sku"]},
+                {"$set": {field: product[field] for field in ("name", "nameLower", "price", "sizes")}},
+                upsert=True
+            )
+            for product in products
+        ]
+        try:
+            result = await get_database().products.bulk_write(operations, ordered=False)
+            return UpsertResult(inserted=result.upserted_count, updated=result.matched_count)
+        except BulkWriteError as e:
+            return UpsertResult(
+                inserted=e.details.get("nUpserted", 0),
+                updated=e.details.get("nMatched", 0),
+                errors={
+                    error["index"]: error.get("errmsg", "Write failed")
+                    for error in e.details.get("writeErrors", [])
+                }
+            )
+
+    async def get_many(self, product_ids: List[Any]) -> Dict[Any, dict]:
+        db = get_product_read_database()
+        # Results are keyed by the ids as given, e.g. ObjectId hex strings
+        given_ids = {product_document_id(product_id): product_id for product_id in product_ids}
+        products = {}
+        async for product in db.products.find({"_id": {"$in": list(given_ids)}}, PRODUCT_LIST_PROJECTION):
+            products[given_ids[product["_id"]]] = product
+        return products
+
+    async def find(self, query: ProductQuery, limit: int, skip: int = 0, descending: bool = False) -> List[dict]:
+        db = get_product_read_database()
+        query_filter = {**build_product_filter(query), **_id_range(query.after_id, query.before_id)}
+        projection = PRODUCT_LIST_PROJECTION
+        sort = [("_id", -1 if descending else 1)]
+        
+        # Text search results are ordered by relevance
+        if query.text_search:
+            projection = {**projection, "score": {"$meta": "textScore"}}
+            sort = [("score", {"$meta": "textScore"})] + sort
+        
+        cursor = db.products.find(query_filter, projection).sort(sort).skip(skip).limit(limit)
+        return await cursor.to_list(length=limit)
+
+    async def count(self, query: ProductQuery) -> int:
+        db = get_product_read_database()
+        return await db.products.count_documents(build_product_filter(query))
+
+    async def estimated_count(self) -> int:
+        # Read from collection metadata, without scanning
+        return await get_product_read_database().products.estimated_document_count()
+
+    async def reserve_stock(self, product_id: Any, size: str, qty: int) -> bool:
+        # Conditional $inc on the variant matched by $elemMatch (positional
+        # `$`); only matches while the variant still has enough stock
+        result = await get_database().products.update_one(
+            {
+                "_id": product_document_id(product_id),
+                "sizes": {"$elemMatch": {"size": size, "quantity": {"$gte": qty}}}
+            },
+            {"$inc": {"sizes.$.quantity": -qty}}
+        )
+        return result.modified_count == 1
+
+    async def release_stock(self, product_id: Any, size: str, qty: int):
+        await get_database().products.update_one(
+            {"_id": product_document_id(product_id), "sizes.size": size},
+            {"$inc": {"sizes.$.quantity": qty}}
+        )
+
+    async def export(self, after_id: Any = None, batch_size: int = 1000) -> AsyncIterator[dict]:
+        # One cursor walking the _id index; the driver holds a single batch
+        db = get_product_read_database()
+        cursor = (
+            db.products.find(_id_range(after_id, None), PRODUCT_EXPORT_PROJECTION)
+            .sort("_id", 1)
+            .batch_size(batch_size)
+        )
+        async for product in cursor:
+            yield product
+
+class MongoOrderRepository(OrderRepository):
+    async def insert(self, order: dict) -> Any:
+        result = await get_database().orders.insert_one(order)
+        await _record_user_stats([order])
+        return result.inserted_id
+
+    async def insert_many(self, orders: List[dict]) -> Dict[int, str]:
+        # insert_many assigns each document its _id before sending
+        errors = {}
+        try:
+            await get_database().orders.insert_many(orders, ordered=False)
+        except BulkWriteError as e:
+            errors = {
+                error["index"]: error.get("errmsg", "Write failed")
+                for error in e.details.get("writeErrors", [])
+            }
+        
+        await _record_user_stats([order for index, order in enumerate(orders) if index not in errors])
+        return errors
+
+    async def find_by_user(
+        self,
+        user_id: str,
+        limit: int,
+        skip: int = 0,
+        after_id: Any = None,
+        before_id: Any = None,
+        descending: bool = False
+    ) -> List[dict]:
+        # Served by the (userId, _id) index: a range seek plus skip/limit
+        query_filter = {"userId": user_id, **_id_range(after_id, before_id)}
+        cursor = (
+            get_database().orders.find(query_filter, ORDER_LIST_PROJECTION)
+            .sort("_id", -1 if descending else 1)
+            .skip(skip)
+            .limit(limit)
+        )
+        return await cursor.to_list(length=limit)
+
+    async def count_by_user(self, user_id: str) -> int:
+        return await get_database().orders.count_documents({"userId": user_id})
+
+    async def summary(self, user_id: str) -> Optional[dict]:
+        return await get_database().user_order_stats.find_one({"_id": user_id})
+
+    async def export(
+        self,
+        user_id: Optional[str] = None,
+        since: Optional[str] = None,
+        after_id: Any = None,
+        batch_size: int = 1000
+    ) -> AsyncIterator[dict]:
+        # A user's export walks the (userId, _id) index
+        query_filter = _id_range(after_id, None)
+        if user_id is not None:
+            query_filter["userId"] = user_id
+        if since is not None:
+            query_filter["createdAt"] = {"$gte": since}
+        
+        cursor = (
+            get_database().orders.find(query_filter, ORDER_EXPORT_PROJECTION)
+            .sort("_id", 1)
+            .batch_size(batch_size)
+        )
+        async for order in cursor:
+            yield order
+
+class MongoIdempotencyRepository(IdempotencyRepository):
+    async def claim(self, key: str, fingerprint: str, lock_seconds: float, ttl_seconds: float) -> Optional[dict]:
+        collection = get_database().idempotency_keys
+        
+        while True:
+            # The unique _id index lets exactly one request insert the key
+            now = datetime.utcnow()
+            locked_until = now + timedelta(seconds=lock_seconds)
+            try:
+                await collection.insert_one({
+                    "_id": key,
+                    "fingerprint": fingerprint,
+                    "status": "pending",
+                    "lockedUntil": locked_until,
+                    "expiresAt": now + timedelta(seconds=ttl_seconds)
+                })
+                return None
+            except DuplicateKeyError:
+                pass
+            
+            # Take over a claim whose owner stopped before completing it
+            taken = await collection.update_one(
+                {"_id": key, "fingerprint": fingerprint, "status": "pending", "lockedUntil": {"$lte": now}},
+                {"$set": {"lockedUntil": locked_until}}
+            )
+            if taken.modified_count == 1:
+                return None
+            
+            # Released or expired in between: try to insert again
+            record = await collection.find_one({"_id": key})
+            if record is not None:
+                return record
+
+    async def complete(self, key: str, status_code: int, body: dict):
+        await get_database().idempotency_keys.update_one(
+            {"_id": key},
+            {"$set": {"status": "completed", "statusCode": status_code, "response": body}}
+        )
+
+    async def release(self, key: str):
+        await get_database().idempotency_keys.delete_one({"_id": key, "status": "pending"})
+
+class MongoStorage(Storage):
+    """MongoDB (Motor) storage backend"""
+
+    name = "mongo"
+
+    def __init__(self):
+        self.products = MongoProductRepository()
+        self.orders = MongoOrderRepository()
+        self.idempotency = MongoIdempotencyRepository()
+
+    @classmethod
+    async def connect(cls) -> "MongoStorage":
+        # Ping, pool warm-up and index creation finish in the background;
+        # /health/ready reports "starting" until the first ping succeeds
+        await connect_to_mongodb(background=True)
+        return cls()
+
+    async def health(self, timeout: float) -> dict:
+        return await check_database_health(timeout)
+
+    async def close(self):
+        await close_mongodb_connection()
@@ -0,0 +1,171 @@
+import gzip
+import logging
+import os
+import tempfile
+from typing import Set
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.middleware.gzip import GZipMiddleware, GZipResponder, IdentityResponder
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+logger = logging.getLogger(__name__)
+
+# Preferred first; brotli only when the module is installed
+PRECOMPRESSED_SUFFIXES = {"br": ".br", "gzip": ".gz"}
+
+def accepted_encodings(accept_encoding: str) -> Set[str]:
+    """Content codings named in an Accept-Encoding header, minus those with q=0"""
+    encodings = set()
+    for part in accept_encoding.lower().split(","):
+        coding, *params = [item.strip() for item in part.split(";")]
+        quality = 1.0
+        for param in params:
+            if param.startswith("q="):
+                try:
+                    quality = float(param[2:])
+                except ValueError:
+                    quality = 0.0
+        if coding and quality > 0:
+            encodings.add(coding)
+    return encodings
+
+def preferred_encodings(accept_encoding: str) -> list:
+    """Encodings this server can produce for a client, best first"""
+    accepted = accepted_encodings(accept_encoding)
+    encodings = []
+    if brotli is not None and "br" in accepted:
+        encodings.append("br")
+    if "gzip" in accepted:
+        encodings.append("gzip")
+    return encodings
+
+class BrotliResponder(IdentityResponder):
+    content_encoding = "br"
+
+    def __init__(self, app: ASGIApp, minimum_size: int, quality: int = 4):
+        super().__init__(app, minimum_size)
+        self.compressor = brotli.Compressor(quality=quality)
+
+    def apply_compression(self, body: bytes, *, more_body: bool) -> bytes:
+        body = self.compressor.process(body)
+        if not more_body:
+            body += self.compressor.finish()
+        return body
+
+class CompressionMiddleware(GZipMiddleware):
+    """Brotli or gzip compression for responses of at least minimum_size bytes
+
+    Brotli is used when the brotli module is installed and the client
+    accepts it, otherwise gzip. Responses that already carry a
+    Content-Encoding, such as precompressed static files, pass through.
+    Levels favour speed, as API responses are compressed per request.
+
+    Compressed bodies differ byte for byte from the identity body, so
+    their ETag is made weak (W/). A 304 is weakened only when the client
+    revalidates with the weak form, i.e. it holds a compressed copy;
+    precompressed static files keep their own strong ETags.
+    """
+
+    def __init__(self, app: ASGIApp, minimum_size: int = 1000, compresslevel: int = 6, brotli_quality: int = 4):
+        super().__init__(app, minimum_size=minimum_size, compresslevel=compresslevel)
+        self.brotli_quality = brotli_quality
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        request_headers = Headers(scope=scope)
+        encodings = preferred_encodings(request_headers.get("accept-encoding", ""))
+        if "br" in encodings:
+            responder = BrotliResponder(self.app, self.minimum_size, quality=self.brotli_quality)
+        elif "gzip" in encodings:
+            responder = GZipResponder(self.app, self.minimum_size, compresslevel=self.compresslevel)
+        else:
+            responder = IdentityResponder(self.app, self.minimum_size)
+
+        async def send_with_etag(message: Message):
+            if message["type"] == "http.response.start":
+                headers = MutableHeaders(raw=message["headers"])
+                if encodings:
+                    compressed = not responder.content_encoding_set and headers.get("content-encoding") == responder.content_encoding
+                    if compressed or (message["status"] == 304 and _revalidates_weak(request_headers, headers)):
+                        weaken_etag(headers)
+                # The app (e.g. static files) and the responder may both
+                # have listed Accept-Encoding
+                if encodings or "vary" in headers:
+                    vary_on_accept_encoding(headers)
+            await send(message)
+
+        await responder(scope, receive, send_with_etag)
+
+def _revalidates_weak(request_headers: Headers, headers: MutableHeaders) -> bool:
+    """Whether If-None-Match carries the weak form of the response's ETag"""
+    etag = headers.get("etag")
+    if not etag or etag.startswith("W/"):
+        return False
+    tags = [tag.strip() for tag in request_headers.get("if-none-match", "").split(",")]
+    return f"W/{etag}" in tags
+
+def vary_on_accept_encoding(headers: MutableHeaders):
+    """List Accept-Encoding in Vary exactly once"""
+    tokens = [token.strip() for token in headers.get("vary", "").split(",") if token.strip()]
+    others = [token for token in tokens if token.lower() != "accept-encoding"]
+    headers["vary"] = ", ".join(others + ["Accept-Encoding"])
+
+def weaken_etag(headers: MutableHeaders):
+    """Turn a strong ETag into a weak one, which stays valid across content codings"""
+    etag = headers.get("etag")
+    if etag and not etag.startswith("W/"):
+        headers["etag"] = f"W/{etag}"
+
+def _write_atomically(path: str, data: bytes, mtime: float):
+    """Replace path with data in one step, so concurrent readers never see a partial file"""
+    fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(path), prefix=".precompress-")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.utime(temp_path, (mtime, mtime))
+        os.replace(temp_path, path)
+    except BaseException:
+        os.unlink(temp_path)
+        raise
+
+def precompress_directory(directory: str, minimum_size: int = 1000) -> int:
+    """Write maximum-level .gz (and .br) copies of static files; returns files written
+
+    Copies get the source's modification time, and ones that already match
+    it are skipped, so this is cheap to run on every deploy.
+    """
+    written = 0
+    for root, _, files in os.walk(directory):
+        for name in files:
+            path = os.path.join(root, name)
+            if name.startswith(".") or name.endswith((".gz", ".br")) or os.path.getsize(path) < minimum_size:
+                continue
+
+            mtime = os.stat(path).st_mtime
+            data = None
+            for encoding, suffix in PRECOMPRESSED_SUFFIXES.items():
+                if encoding == "br" and brotli is None:
+                    continue
+                target = path + suffix
+                if os.path.exists(target) and os.stat(target).st_mtime == mtime:
+                    continue
+
+                if data is None:
+                    with open(path, "rb") as f:
+                        data = f.read()
+                if encoding == "br":
+                    compressed = brotli.compress(data, quality=11)
+                else:
+                    compressed = gzip.compress(data, compresslevel=9, mtime=0)
+                _write_atomically(target, compressed, mtime)
+                written += 1
+
+    if written:
+        logger.info(f"Precompressed {written} static files in {directory}")
+    return written
@@ -0,0 +1,52 @@
+import os
+import time
+from collections import OrderedDict
+from typing import Awaitable, Callable, Hashable
+from utils.metrics import record_cache_lookups
+from utils.single_flight import Abandoned, SingleFlight
+
+class CountCache:
+    """Short-lived cache of filtered listing counts
+
+    Counts are approximate by design: writes do not invalidate them, the
+    TTL bounds how stale they get. Concurrent misses for the same filter
+    share a single count (single-flight).
+    """
+
+    def __init__(self, max_size: int = 1024, ttl: float = 30.0):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._counts = SingleFlight()
+
+    async def get(self, key: Hashable, counter: Callable[[], Awaitable[int]]) -> int:
+        """Return the cached count for key, counting with counter() on a miss"""
+        entry = self._entries.get(key)
+        if entry is not None and entry[0] > time.monotonic():
+            record_cache_lookups("count", hits=1, misses=0)
+            self._entries.move_to_end(key)
+            return entry[1]
+
+        # Another request is already counting this filter; count here if
+        # that request was cancelled
+        flight = self._counts.get(key)
+        if flight is not None:
+            record_cache_lookups("count", hits=1, misses=0)
+            try:
+                return await SingleFlight.wait(flight)
+            except Abandoned:
+                pass
+
+        record_cache_lookups("count", hits=0, misses=1)
+        count = await self._counts.run([key], counter)
+        if self.ttl > 0:
+            self._entries[key] = (time.monotonic() + self.ttl, count)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+        return count
+
+count_cache = CountCache(
+    max_size=int(os.getenv("COUNT_CACHE_SIZE", "1024")),
+    ttl=float(os.getenv("COUNT_CACHE_TTL_SECONDS", "30")),
+)
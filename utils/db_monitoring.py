@@ -0,0 +1,116 @@
+import os
+import threading
+from collections import defaultdict
+from typing import Optional
+from pymongo import monitoring
+from utils.request_timing import current_timing
+
+class PoolStatsListener(monitoring.ConnectionPoolListener):
+    """Connection pool (CMAP) statistics for sizing pools per worker
+
+    pymongo calls listeners from its own threads, so counters are updated
+    under a lock.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._pools = defaultdict(self._new_pool)
+
+    @staticmethod
+    def _new_pool() -> dict:
+        return {
+            "connections": 0,
+            "checked_out": 0,
+            "wait_queue": 0,
+            "max_checked_out": 0,
+            "max_wait_queue": 0,
+            "checkouts": 0,
+            "checkout_failures": 0,
+            "checkout_wait_seconds": 0.0,
+            "max_checkout_wait_seconds": 0.0,
+            "pool_clears": 0,
+        }
+
+    def _update(self, event, **changes):
+        with self._lock:
+            pool = self._pools["%s:%s" % event.address]
+            for key, delta in changes.items():
+                pool[key] += delta
+            pool["max_checked_out"] = max(pool["max_checked_out"], pool["checked_out"])
+            pool["max_wait_queue"] = max(pool["max_wait_queue"], pool["wait_queue"])
+            return pool
+
+    def pool_created(self, event):
+        self._update(event)
+
+    def pool_ready(self, event):
+        pass
+
+    def pool_cleared(self, event):
+        self._update(event, pool_clears=1)
+
+    def pool_closed(self, event):
+        with self._lock:
+            self._pools.pop("%s:%s" % event.address, None)
+
+    def connection_created(self, event):
+        self._update(event, connections=1)
+
+    def connection_ready(self, event):
+        pass
+
+    def connection_closed(self, event):
+        self._update(event, connections=-1)
+
+    def connection_check_out_started(self, event):
+        self._update(event, wait_queue=1)
+
+    def connection_check_out_failed(self, event):
+        self._update(event, wait_queue=-1, checkout_failures=1)
+
+    def connection_checked_out(self, event):
+        wait = getattr(event, "duration", None) or 0.0
+        pool = self._update(event, wait_queue=-1, checked_out=1, checkouts=1, checkout_wait_seconds=wait)
+        with self._lock:
+            pool["max_checkout_wait_seconds"] = max(pool["max_checkout_wait_seconds"], wait)
+
+    def connection_checked_in(self, event):
+        self._update(event, checked_out=-1)
+
+    def stats(self) -> dict:
+        """Snapshot of the counters for every server pool of this worker"""
+        with self._lock:
+            return {"pid": os.getpid(), "pools": {address: dict(pool) for address, pool in self._pools.items()}}
+
+pool_stats = PoolStatsListener()
+
+def command_collection(event) -> Optional[str]:
+    """Collection a command targets, when it names one"""
+    target = event.command.get(event.command_name)
+    if isinstance(target, str):
+        return target
+    return event.command.get("collection")
+
+class CommandTimingListener(monitoring.CommandListener):
+    """Attribute database commands and their durations to the current request"""
+
+    def started(self, event):
+        timing = current_timing()
+        if timing is not None:
+            timing.command_started(
+                (event.request_id, event.connection_id),
+                event.command_name,
+                command_collection(event)
+            )
+
+    def succeeded(self, event):
+        timing = current_timing()
+        if timing is not None:
+            timing.command_finished((event.request_id, event.connection_id), event.duration_micros / 1000, True)
+
+    def failed(self, event):
+        timing = current_timing()
+        if timing is not None:
+            timing.command_finished((event.request_id, event.connection_id), event.duration_micros / 1000, False)
+
+command_timing = CommandTimingListener()
@@ -0,0 +1,89 @@
+import csv
+import io
+import logging
+import os
+from typing import Any, AsyncIterator, Callable, Iterable, List
+from bson import ObjectId
+from fastapi.responses import StreamingResponse
+import orjson
+
+logger = logging.getLogger(__name__)
+
+# Documents fetched per database round trip, and per chunk written to the client
+EXPORT_BATCH_SIZE = int(os.getenv("EXPORT_BATCH_SIZE", "1000"))
+
+MEDIA_TYPES = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv",
+}
+
+def parse_document_id(value: str) -> Any:
+    """Turn an exported id back into an _id: ObjectId when it is 24 hex digits"""
+    if len(value) == 24 and ObjectId.is_valid(value):
+        return ObjectId(value)
+    return value
+
+def _csv_encoder() -> Callable[[Iterable[list]], bytes]:
+    """Encode CSV rows to bytes, reusing one buffer"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+
+    def encode(rows: Iterable[list]) -> bytes:
+        buffer.seek(0)
+        buffer.truncate()
+        writer.writerows(rows)
+        return buffer.getvalue().encode()
+
+    return encode
+
+async def _chunks(documents: AsyncIterator[dict], encode: Callable[[dict], bytes]) -> AsyncIterator[bytes]:
+    """Encode documents and write them out EXPORT_BATCH_SIZE at a time"""
+    buffer: List[bytes] = []
+    try:
+        async for document in documents:
+            buffer.append(encode(document))
+            if len(buffer) >= EXPORT_BATCH_SIZE:
+                yield b"".join(buffer)
+                buffer.clear()
+    except Exception:
+        # Headers are already sent: flush the complete records, then abort
+        # so the client can resume from the last id it received
+        logger.exception("Export interrupted")
+        if buffer:
+            yield b"".join(buffer)
+        raise
+
+    if buffer:
+        yield b"".join(buffer)
+
+def export_response(
+    documents: AsyncIterator[dict],
+    export_format: str,
+    filename: str,
+    to_record: Callable[[dict], dict],
+    csv_columns: List[str],
+    to_csv_rows: Callable[[dict], Iterable[list]]
+) -> StreamingResponse:
+    """Stream documents as NDJSON (one record per line) or CSV
+
+    to_record builds the NDJSON record for a document; to_csv_rows builds
+    its CSV rows, matching csv_columns.
+    """
+    if export_format == "csv":
+        encode_rows = _csv_encoder()
+        header = encode_rows([csv_columns])
+        encode = lambda document: encode_rows(to_csv_rows(document))
+
+        async def body():
+            yield header
+            async for chunk in _chunks(documents, encode):
+                yield chunk
+    else:
+        encode = lambda document: orjson.dumps(to_record(document)) + b"\n"
+        body = lambda: _chunks(documents, encode)
+
+    return StreamingResponse(
+        body(),
+        media_type=MEDIA_TYPES[export_format],
+        headers={"Content-Disposition": f'attachment; filename="{filename}.{export_format}"'}
+    )
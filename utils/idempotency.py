@@ -0,0 +1,106 @@
+import asyncio
+import hashlib
+import os
+from dataclasses import dataclass, replace
+from typing import Awaitable, Callable
+from fastapi import HTTPException
+import orjson
+from storage import get_storage
+from utils.single_flight import Abandoned, SingleFlight
+
+@dataclass
+class StoredResponse:
+    status_code: int
+    body: dict
+    replayed: bool = False
+
+def request_fingerprint(payload: dict) -> str:
+    """Stable hash of a request body, to catch a key reused for another request"""
+    return hashlib.blake2b(orjson.dumps(payload, option=orjson.OPT_SORT_KEYS), digest_size=16).hexdigest()
+
+class IdempotentRequests:
+    """Run the request behind each Idempotency-Key once and replay its response
+
+    Concurrent duplicates in this process await the first one's result,
+    and take over if it is cancelled; duplicates arriving at other workers
+    find its pending record and poll until it completes. Responses below 500 are stored for ttl seconds.
+    Server errors release the key so the client can retry.
+    """
+
+    def __init__(self, ttl: float = 86400.0, lock_timeout: float = 30.0, wait_timeout: float = 10.0):
+        self.ttl = ttl
+        self.lock_timeout = lock_timeout
+        self.wait_timeout = wait_timeout
+        # Keyed by (key, fingerprint): a reused key with another body goes
+        # to storage, which rejects it
+        self._requests = SingleFlight()
+
+    async def run(
+        self,
+        key: str,
+        fingerprint: str,
+        handler: Callable[[], Awaitable[dict]],
+        status_code: int = 200
+    ) -> StoredResponse:
+        """Return the response for key, calling handler() only if no request has run it"""
+        flight = self._requests.get((key, fingerprint))
+        if flight is not None:
+            try:
+                return replace(await SingleFlight.wait(flight), replayed=True)
+            except Abandoned:
+                # The first request was cancelled and released the key
+                pass
+
+        return await self._requests.run(
+            [(key, fingerprint)],
+            lambda: self._run_once(key, fingerprint, handler, status_code)
+        )
+
+    async def _run_once(
+        self,
+        key: str,
+        fingerprint: str,
+        handler: Callable[[], Awaitable[dict]],
+        status_code: int
+    ) -> StoredResponse:
+        """Claim key in storage and run handler, or wait for the worker that claimed it"""
+        records = get_storage().idempotency
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.wait_timeout
+        delay = 0.05
+
+        while True:
+            record = await records.claim(key, fingerprint, self.lock_timeout, self.ttl)
+            if record is None:
+                break
+            _check_fingerprint(record["fingerprint"], fingerprint)
+            if record["status"] == "completed":
+                return StoredResponse(record["statusCode"], record["response"], replayed=True)
+            if loop.time() >= deadline:
+                raise HTTPException(status_code=409, detail="A request with this Idempotency-Key is still in progress")
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, 0.5)
+
+        try:
+            response = StoredResponse(status_code, await handler())
+        except HTTPException as e:
+            if e.status_code >= 500:
+                await records.release(key)
+                raise
+            response = StoredResponse(e.status_code, {"detail": e.detail})
+        except BaseException:
+            await records.release(key)
+            raise
+
+        await records.complete(key, response.status_code, response.body)
+        return response
+
+def _check_fingerprint(stored: str, fingerprint: str):
+    if stored != fingerprint:
+        raise HTTPException(status_code=422, detail="Idempotency-Key was already used with a different request body")
+
+idempotent_requests = IdempotentRequests(
+    ttl=float(os.getenv("IDEMPOTENCY_KEY_TTL_SECONDS", "86400")),
+    lock_timeout=float(os.getenv("IDEMPOTENCY_LOCK_SECONDS", "30")),
+    wait_timeout=float(os.getenv("IDEMPOTENCY_WAIT_SECONDS", "10")),
+)
@@ -0,0 +1,55 @@
+import asyncio
+import logging
+
+logger = logging.getLogger(__name__)
+
+class InFlightRequests:
+    """Count of HTTP requests whose response has not been fully sent"""
+
+    def __init__(self):
+        self.count = 0
+        self._idle = asyncio.Event()
+        self._idle.set()
+
+    def started(self):
+        self.count += 1
+        self._idle.clear()
+
+    def finished(self):
+        self.count -= 1
+        if self.count == 0:
+            self._idle.set()
+
+    async def drain(self, timeout: float) -> bool:
+        """Wait up to timeout seconds for in-flight requests; False if some remain"""
+        if self.count:
+            logger.info(f"Draining {self.count} in-flight requests")
+        try:
+            await asyncio.wait_for(self._idle.wait(), timeout)
+            return True
+        except asyncio.TimeoutError:
+            logger.warning(f"{self.count} requests still in flight after {timeout}s, shutting down anyway")
+            return False
+
+in_flight = InFlightRequests()
+
+class InFlightMiddleware:
+    """Track requests in in_flight until their last response chunk is sent
+
+    A plain ASGI middleware rather than @app.middleware, so streamed
+    responses such as exports count until they finish.
+    """
+
+    def __init__(self, app, tracker: InFlightRequests = in_flight):
+        self.app = app
+        self.tracker = tracker
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        self.tracker.started()
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            self.tracker.finished()
@@ -0,0 +1,165 @@
+"""
+Prometheus metrics
+
+Metrics live in the prometheus_client registry of each worker. When
+PROMETHEUS_MULTIPROC_DIR is set (an empty directory shared by all uvicorn
+workers), prometheus_client keeps the values in memory-mapped files instead
+and /metrics aggregates every worker, whichever one serves the scrape.
+"""
+
+import os
+import threading
+from typing import Dict
+from prometheus_client import CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, Counter, Gauge, Histogram, generate_latest
+from prometheus_client import multiprocess
+from pymongo import monitoring
+from utils.db_monitoring import command_collection
+
+MULTIPROCESS = bool(os.getenv("PROMETHEUS_MULTIPROC_DIR"))
+
+REQUESTS = Counter(
+    "http_requests_total", "HTTP requests handled",
+    ["method", "route", "status"]
+)
+REQUEST_LATENCY = Histogram(
+    "http_request_duration_seconds", "HTTP request latency",
+    ["method", "route", "status"],
+    buckets=(0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+)
+REQUESTS_IN_FLIGHT = Gauge(
+    "http_requests_in_flight", "HTTP requests being handled",
+    multiprocess_mode="livesum"
+)
+
+POOL_CONNECTIONS = Gauge(
+    "mongodb_pool_connections", "Open pooled connections",
+    ["address"], multiprocess_mode="livesum"
+)
+POOL_CHECKED_OUT = Gauge(
+    "mongodb_pool_checked_out_connections", "Connections checked out of the pool",
+    ["address"], multiprocess_mode="livesum"
+)
+POOL_WAIT_QUEUE = Gauge(
+    "mongodb_pool_wait_queue", "Operations waiting for a pooled connection",
+    ["address"], multiprocess_mode="livesum"
+)
+POOL_CHECKOUT_WAIT = Histogram(
+    "mongodb_pool_checkout_wait_seconds", "Time spent waiting to check out a connection",
+    ["address"],
+    buckets=(0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0)
+)
+POOL_CHECKOUT_FAILURES = Counter(
+    "mongodb_pool_checkout_failures_total", "Failed connection checkouts",
+    ["address", "reason"]
+)
+
+COMMAND_LATENCY = Histogram(
+    "mongodb_command_duration_seconds", "Database command latency",
+    ["collection", "command"],
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0)
+)
+COMMAND_FAILURES = Counter(
+    "mongodb_command_failures_total", "Failed database commands",
+    ["collection", "command"]
+)
+
+CACHE_LOOKUPS = Counter(
+    "cache_lookups_total", "Cache lookups; hit ratio = hit / (hit + miss)",
+    ["cache", "result"]
+)
+
+def _address(event) -> str:
+    return "%s:%s" % event.address
+
+class PoolMetricsListener(monitoring.ConnectionPoolListener):
+    """Mirror connection pool events into Prometheus metrics"""
+
+    def pool_created(self, event):
+        pass
+
+    def pool_ready(self, event):
+        pass
+
+    def pool_cleared(self, event):
+        pass
+
+    def pool_closed(self, event):
+        pass
+
+    def connection_created(self, event):
+        POOL_CONNECTIONS.labels(_address(event)).inc()
+
+    def connection_ready(self, event):
+        pass
+
+    def connection_closed(self, event):
+        POOL_CONNECTIONS.labels(_address(event)).dec()
+
+    def connection_check_out_started(self, event):
+        POOL_WAIT_QUEUE.labels(_address(event)).inc()
+
+    def connection_check_out_failed(self, event):
+        POOL_WAIT_QUEUE.labels(_address(event)).dec()
+        POOL_CHECKOUT_FAILURES.labels(_address(event), str(event.reason)).inc()
+
+    def connection_checked_out(self, event):
+        POOL_WAIT_QUEUE.labels(_address(event)).dec()
+        POOL_CHECKED_OUT.labels(_address(event)).inc()
+        POOL_CHECKOUT_WAIT.labels(_address(event)).observe(getattr(event, "duration", None) or 0.0)
+
+    def connection_checked_in(self, event):
+        POOL_CHECKED_OUT.labels(_address(event)).dec()
+
+class CommandMetricsListener(monitoring.CommandListener):
+    """Record database command latency per collection and command"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._in_flight: Dict[tuple, str] = {}
+
+    def started(self, event):
+        with self._lock:
+            self._in_flight[(event.request_id, event.connection_id)] = command_collection(event) or ""
+
+    def _finished(self, event) -> str:
+        with self._lock:
+            return self._in_flight.pop((event.request_id, event.connection_id), "")
+
+    def succeeded(self, event):
+        collection = self._finished(event)
+        COMMAND_LATENCY.labels(collection, event.command_name).observe(event.duration_micros / 1e6)
+
+    def failed(self, event):
+        collection = self._finished(event)
+        COMMAND_LATENCY.labels(collection, event.command_name).observe(event.duration_micros / 1e6)
+        COMMAND_FAILURES.labels(collection, event.command_name).inc()
+
+pool_metrics = PoolMetricsListener()
+command_metrics = CommandMetricsListener()
+
+def observe_request(request, status: int, seconds: float):
+    """Count a finished request and observe its latency under its route template"""
+    route = getattr(request.scope.get("route"), "path", "unmatched")
+    REQUESTS.labels(request.method, route, str(status)).inc()
+    REQUEST_LATENCY.labels(request.method, route, str(status)).observe(seconds)
+
+def record_cache_lookups(cache: str, hits: int, misses: int):
+    """Count cache hits and misses"""
+    if hits:
+        CACHE_LOOKUPS.labels(cache, "hit").inc(hits)
+    if misses:
+        CACHE_LOOKUPS.labels(cache, "miss").inc(misses)
+
+def render_metrics() -> tuple:
+    """Metrics in the Prometheus text format, aggregated across workers in multiprocess mode"""
+    if MULTIPROCESS:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return generate_latest(registry), CONTENT_TYPE_LATEST
+
+def mark_worker_dead():
+    """Drop this worker's live gauges from the multiprocess aggregate"""
+    if MULTIPROCESS:
+        multiprocess.mark_process_dead(os.getpid())
@@ -1,8 +1,50 @@
 from models import PaginationMetadata
-from typing import Optional
+from typing import Any, List, Optional, Tuple
+from bson import json_util
+import base64
 
-def calculate_pagination(offset: int, limit: int, total_count: int, current_page_count: int) -> PaginationMetadata:
-    """Calculate pagination metadata"""
+def encode_cursor(document_id: Any) -> str:
+    """Encode the sort key (_id) of a document as an opaque cursor"""
+    payload = json_util.dumps({"_id": document_id}, separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+def decode_cursor(cursor: str) -> Any:
+    """Decode a cursor back into the _id it was built from"""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        return json_util.loads(base64.urlsafe_b64decode(padded))["_id"]
+    except Exception:
+        raise ValueError(f"Invalid cursor: {cursor}")
+
+def cursor_bounds(after: Optional[str], before: Optional[str]) -> Tuple[Any, Any]:
+    """Decode after/before cursors into exclusive (after_id, before_id) bounds
+    
+    `before` pages are read in descending _id order and reversed afterwards.
+    """
+    if after is not None and before is not None:
+        raise ValueError("Use either 'after' or 'before', not both")
+    
+    after_id = decode_cursor(after) if after is not None else None
+    before_id = decode_cursor(before) if before is not None else None
+    return after_id, before_id
+
+def calculate_pagination(
+    offset: int,
+    limit: int,
+    total_count: int,
+    current_page_count: int,
+    include_total: bool = False,
+    first_id: Any = None,
+    last_id: Any = None
+) -> PaginationMetadata:
+    """Calculate pagination metadata
+    
+    total_count only needs to exceed offset + limit when a next page exists,
+    so callers that fetch limit + 1 documents can pass offset + fetched count
+    instead of an exact count. The count is reported back as `total` only
+    when include_total is set. When the page's first and last _id are given,
+    cursors are included so clients can switch to keyset pagination.
+    """
     
     # Calculate next page offset
     next_offset = None
@@ -14,8 +56,54 @@ def calculate_pagination(offset: int, limit: int, total_count: int, current_page
     if offset > 0:
         previous_offset = str(max(0, offset - limit))
     
+    # Cursors pointing at the edges of the current page
+    next_cursor = None
+    if next_offset is not None and last_id is not None:
+        next_cursor = encode_cursor(last_id)
+    
+    previous_cursor = None
+    if previous_offset is not None and first_id is not None:
+        previous_cursor = encode_cursor(first_id)
+    
     return PaginationMetadata(
         next=next_offset,
         limit=current_page_count,
-        previous=previous_offset
+        previous=previous_offset,
+        total=total_count if include_total else None,
+        nextCursor=next_cursor,
+        previousCursor=previous_cursor
+    )
+
+def calculate_cursor_pagination(
+    documents: List[dict],
+    limit: int,
+    after: Optional[str] = None,
+    before: Optional[str] = None
+) -> Tuple[List[dict], PaginationMetadata]:
+    """Trim a keyset page fetched with limit + 1 and calculate its metadata
+    
+    Returns the documents for the page in ascending _id order together with
+    the pagination metadata carrying the next/previous cursors.
+    """
+    has_more = len(documents) > limit
+    page = documents[:limit]
+    
+    if before is not None:
+        page.reverse()
+        has_next, has_previous = True, has_more
+    else:
+        has_next, has_previous = has_more, after is not None
+    
+    next_cursor = None
+    if has_next and page:
+        next_cursor = encode_cursor(page[-1]["_id"])
+    
+    previous_cursor = None
+    if has_previous and page:
+        previous_cursor = encode_cursor(page[0]["_id"])
+    
+    return page, PaginationMetadata(
+        limit=len(page),
+        nextCursor=next_cursor,
+        previousCursor=previous_cursor
     )
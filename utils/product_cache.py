@@ -0,0 +1,203 @@
+import asyncio
+import logging
+import os
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Iterable, Optional
+from pymongo.errors import OperationFailure, PyMongoError
+from storage import get_storage
+from utils.metrics import record_cache_lookups
+from utils.response_cache import response_cache
+from utils.single_flight import Abandoned, SingleFlight
+
+logger = logging.getLogger(__name__)
+
+# Change events that can affect cached fields; stock-only updates are skipped
+_RELEVANT_CHANGES = [{"$match": {"$or": [
+    {"operationType": {"$nin": ["update"]}},
+    {"updateDescription.updatedFields.name": {"$exists": True}},
+    {"updateDescription.updatedFields.price": {"$exists": True}},
+    {"updateDescription.removedFields": {"$in": ["name", "price"]}},
+]}}]
+
+Loader = Callable[[list], Awaitable[Dict[Any, dict]]]
+
+class ProductCache:
+    """Bounded in-process product cache with LRU eviction and TTL
+
+    Only name and price are cached; stock levels always come from storage.
+
+    Concurrent misses for the same product share a single load
+    (single-flight), and hit/miss counters are kept for monitoring.
+    """
+
+    def __init__(self, max_size: int = 10000, ttl: float = 60.0):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[Any, tuple]" = OrderedDict()
+        self._loads = SingleFlight()
+        self._generation = 0
+
+    @property
+    def generation(self) -> int:
+        """Bumped by every invalidation; see prime()"""
+        return self._generation
+
+    async def get_many(self, product_ids: Iterable, loader: Loader) -> Dict[Any, dict]:
+        """Return cached products, loading the missing ones with loader(ids)"""
+        found = {}
+        remaining = list(dict.fromkeys(product_ids))
+
+        while remaining:
+            missing = []
+            waiting = {}
+            now = time.monotonic()
+
+            for product_id in remaining:
+                entry = self._entries.get(product_id)
+                if entry and entry[0] > now:
+                    self._entries.move_to_end(product_id)
+                    found[product_id] = entry[1]
+                elif self._loads.get(product_id) is not None:
+                    waiting[product_id] = self._loads.get(product_id)
+                else:
+                    missing.append(product_id)
+
+            hits = len(remaining) - len(missing)
+            self.hits += hits
+            self.misses += len(missing)
+            record_cache_lookups("product", hits=hits, misses=len(missing))
+
+            if missing:
+                found.update(await self._load(missing, loader))
+
+            # Products another request is already loading; look them up
+            # again if that request was cancelled
+            remaining = []
+            for product_id, flight in waiting.items():
+                try:
+                    loaded = await SingleFlight.wait(flight)
+                except Abandoned:
+                    remaining.append(product_id)
+                    continue
+                if product_id in loaded:
+                    found[product_id] = loaded[product_id]
+
+        return found
+
+    async def _load(self, product_ids: list, loader: Loader) -> Dict[Any, dict]:
+        """Load products once, sharing the result with concurrent callers"""
+        generation = self._generation
+        loaded = await self._loads.run(product_ids, lambda: loader(product_ids))
+
+        # Skip storing results that an invalidation raced with
+        if generation == self._generation:
+            for product_id, product in loaded.items():
+                self._store(product_id, product)
+
+        return loaded
+
+    def _store(self, product_id: Any, product: dict):
+        """Insert a product, evicting the least recently used ones"""
+        self._entries[product_id] = (time.monotonic() + self.ttl, product)
+        self._entries.move_to_end(product_id)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    def prime(self, products: Iterable[dict], generation: int):
+        """Store products fetched by another query that started at generation
+
+        Keyed by string id, as orders refer to products. Nothing is stored
+        if an invalidation happened since the query started.
+        """
+        if generation != self._generation:
+            return
+        for product in products:
+            self._store(str(product["_id"]), {field: product[field] for field in ("_id", "name", "price")})
+
+    def invalidate(self, product_id: Any):
+        """Drop a single product"""
+        self._generation += 1
+        self._entries.pop(product_id, None)
+
+    def clear(self):
+        """Drop every product"""
+        self._generation += 1
+        self._entries.clear()
+
+    def stats(self) -> dict:
+        """Cache size and hit/miss counters"""
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "max_size": self.max_size,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": self.hits / lookups if lookups else 0.0,
+        }
+
+product_cache = ProductCache(
+    max_size=int(os.getenv("PRODUCT_CACHE_SIZE", "10000")),
+    ttl=float(os.getenv("PRODUCT_CACHE_TTL_SECONDS", "60")),
+)
+
+async def _load_products(product_ids: list) -> Dict[Any, dict]:
+    """Fetch products by id from the storage backend in one batch"""
+    return await get_storage().products.get_many(product_ids)
+
+async def get_products(product_ids: Iterable) -> Dict[Any, dict]:
+    """Get name and price for products by id through the product cache"""
+    return await product_cache.get_many(product_ids, _load_products)
+
+_watcher_task: Optional[asyncio.Task] = None
+
+async def watch_product_changes(retry_delay: float = 5.0):
+    """Invalidate cached products from a MongoDB change stream
+
+    Keeps multiple workers coherent when the deployment supports change
+    streams (replica sets and Atlas), and also expires this worker's cached
+    product listings. Otherwise the TTLs bound staleness.
+    """
+    # Imported here so the memory backend never loads Motor
+    from database import get_database
+    
+    while True:
+        try:
+            db = get_database()
+            async with db.products.watch(_RELEVANT_CHANGES) as stream:
+                # Events may have been missed while the stream was down
+                product_cache.clear()
+                response_cache.bump("products")
+                logger.info("Watching product changes for cache invalidation")
+                async for change in stream:
+                    response_cache.bump("products")
+                    product_id = change.get("documentKey", {}).get("_id")
+                    if product_id is None:
+                        product_cache.clear()
+                    else:
+                        product_cache.invalidate(str(product_id))
+        except OperationFailure as e:
+            logger.info(f"Product change stream unavailable, relying on cache TTL: {e}")
+            return
+        except PyMongoError as e:
+            logger.warning(f"Product change stream interrupted: {e}")
+            await asyncio.sleep(retry_delay)
+
+def start_product_cache_invalidation():
+    """Start the change stream watcher in the background"""
+    global _watcher_task
+    if os.getenv("PRODUCT_CACHE_CHANGE_STREAM", "true").lower() == "true":
+        _watcher_task = asyncio.create_task(watch_product_changes())
+
+async def stop_product_cache_invalidation():
+    """Cancel the change stream watcher"""
+    global _watcher_task
+    if _watcher_task:
+        _watcher_task.cancel()
+        try:
+            await _watcher_task
+        except asyncio.CancelledError:
+            pass
+        _watcher_task = None
@@ -0,0 +1,202 @@
+import codecs
+import csv
+import os
+from typing import AsyncIterator, Dict, List, Optional, Tuple
+from pydantic import TypeAdapter, ValidationError
+import orjson
+from models import ProductImportRow
+from storage import ProductRepository
+
+# Rows validated and written per bulk upsert
+IMPORT_BATCH_SIZE = int(os.getenv("IMPORT_BATCH_SIZE", "1000"))
+MAX_REPORTED_ERRORS = 1000
+
+# (row number, parsed fields or None, parse error or None)
+Record = Tuple[int, Optional[dict], Optional[str]]
+
+_rows_adapter = TypeAdapter(List[ProductImportRow])
+
+async def _lines(chunks: AsyncIterator[bytes]) -> AsyncIterator[str]:
+    """Decode a byte stream into lines, holding at most one partial line"""
+    decoder = codecs.getincrementaldecoder("utf-8-sig")()
+    pending = ""
+    async for chunk in chunks:
+        pending += decoder.decode(chunk)
+        lines = pending.split("\n")
+        pending = lines.pop()
+        for line in lines:
+            yield line.rstrip("\r")
+
+    pending += decoder.decode(b"", final=True)
+    if pending:
+        yield pending.rstrip("\r")
+
+async def ndjson_records(chunks: AsyncIterator[bytes]) -> AsyncIterator[Record]:
+    """Parse one JSON product object per line"""
+    row = 0
+    async for line in _lines(chunks):
+        if not line.strip():
+            continue
+        row += 1
+        try:
+            data = orjson.loads(line)
+        except orjson.JSONDecodeError as e:
+            yield row, None, f"Invalid JSON: {e}"
+            continue
+        if not isinstance(data, dict):
+            yield row, None, "Expected a JSON object"
+            continue
+        yield row, data, None
+
+def parse_sizes(value: str) -> List[dict]:
+    """Parse the CSV sizes column: size:quantity pairs separated by semicolons"""
+    sizes = []
+    for entry in filter(None, (entry.strip() for entry in value.split(";"))):
+        size, separator, quantity = entry.rpartition(":")
+        if not separator or not size:
+            raise ValueError(f"Invalid sizes entry '{entry}', expected size:quantity")
+        sizes.append({"size": size, "quantity": quantity})
+    return sizes
+
+async def csv_records(chunks: AsyncIterator[bytes]) -> AsyncIterator[Record]:
+    """Parse CSV rows with a header row (sku, name, price, sizes)
+
+    Other columns, such as `id` from an export, are ignored. Quoted
+    fields may span lines.
+    """
+    header = None
+    row = 0
+    record_lines = []
+    quotes = 0
+
+    async for line in _lines(chunks):
+        # An odd number of quotes so far means a quoted field continues
+        # on the next line
+        record_lines.append(line)
+        quotes += line.count('"')
+        if quotes % 2:
+            continue
+        text = "\n".join(record_lines)
+        record_lines = []
+        quotes = 0
+
+        if not text.strip():
+            continue
+        values = next(csv.reader([text]))
+        if header is None:
+            header = [name.strip() for name in values]
+            continue
+
+        row += 1
+        data = dict(zip(header, values))
+        try:
+            data["sizes"] = parse_sizes(data.get("sizes", ""))
+        except ValueError as e:
+            yield row, data, str(e)
+            continue
+        yield row, data, None
+
+    if record_lines:
+        row += 1
+        yield row, None, "Unterminated quoted field"
+
+def _format_errors(errors: List[dict]) -> str:
+    """Join Pydantic errors of one row as 'field: message'"""
+    return "; ".join(
+        f"{'.'.join(str(part) for part in error['loc'])}: {error['msg']}" if error["loc"] else error["msg"]
+        for error in errors
+    )
+
+class _ImportReport:
+    """Counters and the capped per-row error list of an import"""
+
+    def __init__(self):
+        self.received = 0
+        self.inserted = 0
+        self.updated = 0
+        self.failed = 0
+        self.errors: List[dict] = []
+
+    def fail(self, row: int, data: Optional[dict], error: str):
+        self.failed += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            sku = data.get("sku") if data else None
+            self.errors.append({"row": row, "sku": sku if isinstance(sku, str) else None, "error": error})
+
+    def as_dict(self) -> dict:
+        return {
+            "received": self.received,
+            "inserted": self.inserted,
+            "updated": self.updated,
+            "failed": self.failed,
+            "errors": sorted(self.errors, key=lambda error: error["row"]),
+            "errorsTruncated": self.failed > len(self.errors),
+        }
+
+def _validate(rows: List[Tuple[int, dict]], report: _ImportReport) -> List[Tuple[int, ProductImportRow]]:
+    """Validate a chunk of rows at once, falling back to per-row errors"""
+    try:
+        products = _rows_adapter.validate_python([data for _, data in rows])
+        return [(row, product) for (row, _), product in zip(rows, products)]
+    except ValidationError as e:
+        errors_by_index: Dict[int, List[dict]] = {}
+        for error in e.errors():
+            errors_by_index.setdefault(error["loc"][0], []).append({**error, "loc": error["loc"][1:]})
+
+    valid = []
+    for index, (row, data) in enumerate(rows):
+        if index in errors_by_index:
+            report.fail(row, data, _format_errors(errors_by_index[index]))
+        else:
+            valid.append((row, ProductImportRow.model_validate(data)))
+    return valid
+
+async def _write(products: ProductRepository, valid: List[Tuple[int, ProductImportRow]], report: _ImportReport):
+    """Upsert validated rows, splitting the batch wherever a SKU repeats"""
+    batch: List[Tuple[int, ProductImportRow]] = []
+    skus = set()
+
+    async def flush():
+        documents = [
+            {**product.model_dump(), "nameLower": product.name.lower()}
+            for _, product in batch
+        ]
+        result = await products.upsert_many(documents)
+        report.inserted += result.inserted
+        report.updated += result.updated
+        for index, error in result.errors.items():
+            row, product = batch[index]
+            report.fail(row, {"sku": product.sku}, f"Write failed: {error}")
+        batch.clear()
+        skus.clear()
+
+    for row, product in valid:
+        # Later rows for the same SKU must be applied after earlier ones
+        if product.sku in skus:
+            await flush()
+        batch.append((row, product))
+        skus.add(product.sku)
+
+    if batch:
+        await flush()
+
+async def import_product_rows(records: AsyncIterator[Record], products: ProductRepository) -> dict:
+    """Validate and upsert parsed rows IMPORT_BATCH_SIZE at a time"""
+    report = _ImportReport()
+    pending: List[Tuple[int, dict]] = []
+
+    async for row, data, error in records:
+        report.received += 1
+        if error:
+            report.fail(row, data, error)
+            continue
+
+        pending.append((row, data))
+        if len(pending) >= IMPORT_BATCH_SIZE:
+            await _write(products, _validate(pending, report), report)
+            pending = []
+
+    if pending:
+        await _write(products, _validate(pending, report), report)
+
+    return report.as_dict()
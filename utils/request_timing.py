@@ -0,0 +1,154 @@
+import asyncio
+import json
+import logging
+import os
+import random
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import wraps
+from typing import Any, Dict, List, Optional
+from fastapi import Request, Response
+from fastapi.routing import APIRoute
+
+logger = logging.getLogger("request_timing")
+
+# Fraction of requests that are instrumented; off by default, as sampled
+# responses expose database timings to clients in Server-Timing
+SAMPLE_RATE = float(os.getenv("REQUEST_TIMING_SAMPLE_RATE", "0"))
+
+# Instrumented requests slower than this log their full command list
+SLOW_REQUEST_MS = float(os.getenv("REQUEST_TIMING_SLOW_MS", "1000"))
+
+class RequestTiming:
+    """Database commands and phase durations collected for one request
+
+    Motor runs driver calls in executor threads with a copy of the
+    request's context, so command events from any thread land on the
+    same object.
+    """
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.handler_started: Optional[float] = None
+        self.handler_finished: Optional[float] = None
+        self.commands: List[dict] = []
+        self.phases: Dict[str, float] = {}
+        self._in_flight: Dict[Any, tuple] = {}
+
+    def command_started(self, key: Any, name: str, collection: Optional[str]):
+        self._in_flight[key] = (name, collection)
+
+    def command_finished(self, key: Any, duration_ms: float, ok: bool):
+        name, collection = self._in_flight.pop(key, (None, None))
+        if name is None:
+            return
+        self.commands.append({
+            "command": name,
+            "collection": collection,
+            "ms": round(duration_ms, 3),
+            "ok": ok,
+        })
+
+    @property
+    def db_ms(self) -> float:
+        return sum((command["ms"] for command in self.commands), 0.0)
+
+    def add_phase(self, name: str, duration_ms: float):
+        self.phases[name] = self.phases.get(name, 0.0) + duration_ms
+
+    def summary(self, finished: float) -> Dict[str, float]:
+        """Milliseconds spent per phase; db and serialize overlap app"""
+        phases = {"db": self.db_ms}
+        if self.handler_started is not None and self.handler_finished is not None:
+            phases["validate"] = (self.handler_started - self.started) * 1000
+            phases["app"] = (self.handler_finished - self.handler_started) * 1000
+            self.add_phase("serialize", (finished - self.handler_finished) * 1000)
+        phases.update(self.phases)
+        phases["total"] = (finished - self.started) * 1000
+        return {name: round(duration, 3) for name, duration in phases.items()}
+
+_current: ContextVar[Optional[RequestTiming]] = ContextVar("request_timing", default=None)
+
+def current_timing() -> Optional[RequestTiming]:
+    """Timing of the request being handled, if it is instrumented"""
+    return _current.get()
+
+def start_request_timing() -> Optional[RequestTiming]:
+    """Begin instrumenting the current request if it is sampled"""
+    if SAMPLE_RATE <= 0 or random.random() >= SAMPLE_RATE:
+        return None
+    timing = RequestTiming()
+    _current.set(timing)
+    return timing
+
+@contextmanager
+def timed_phase(name: str):
+    """Add the time spent in a block to a named phase of the current request"""
+    timing = _current.get()
+    if timing is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        timing.add_phase(name, (time.perf_counter() - start) * 1000)
+
+def server_timing_header(phases: Dict[str, float], db_commands: int) -> str:
+    """Format phase durations as a Server-Timing header value"""
+    entries = []
+    for name, duration in phases.items():
+        entry = f"{name};dur={duration}"
+        if name == "db":
+            entry += f';desc="{db_commands} commands"'
+        entries.append(entry)
+    return ", ".join(entries)
+
+def finish_request_timing(timing: RequestTiming, request: Request, response: Response):
+    """Attach Server-Timing to the response and log the request's timings"""
+    phases = timing.summary(time.perf_counter())
+    response.headers["Server-Timing"] = server_timing_header(phases, len(timing.commands))
+
+    route = request.scope.get("route")
+    record = {
+        "method": request.method,
+        "path": request.url.path,
+        "route": getattr(route, "path", None),
+        "status": response.status_code,
+        "db_commands": len(timing.commands),
+        "timings_ms": phases,
+    }
+    if phases["total"] >= SLOW_REQUEST_MS:
+        record["commands"] = timing.commands
+        logger.warning(json.dumps(record))
+    else:
+        logger.info(json.dumps(record))
+
+def _mark_handler(endpoint):
+    """Wrap an async endpoint to record when it starts and returns"""
+    if not asyncio.iscoroutinefunction(endpoint):
+        return endpoint
+
+    @wraps(endpoint)
+    async def timed_endpoint(*args, **kwargs):
+        timing = _current.get()
+        if timing is None:
+            return await endpoint(*args, **kwargs)
+        timing.handler_started = time.perf_counter()
+        try:
+            return await endpoint(*args, **kwargs)
+        finally:
+            timing.handler_finished = time.perf_counter()
+
+    return timed_endpoint
+
+class TimedRoute(APIRoute):
+    """Route that splits request time into validation, handler and serialization
+
+    Time before the endpoint runs covers body parsing and validation; time
+    after it returns covers response model validation and serialization.
+    """
+
+    def __init__(self, path: str, endpoint, **kwargs):
+        super().__init__(path, _mark_handler(endpoint), **kwargs)
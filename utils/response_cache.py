@@ -0,0 +1,98 @@
+import hashlib
+import os
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Dict, Hashable, Optional
+from fastapi import Response
+from utils.metrics import record_cache_lookups
+
+@dataclass
+class CachedResponse:
+    body: bytes
+    etag: str
+    expires_at: float
+
+def make_etag(body: bytes) -> str:
+    """Strong ETag derived from the response body"""
+    return '"' + hashlib.blake2b(body, digest_size=16).hexdigest() + '"'
+
+class ResponseCache:
+    """Short-lived cache of serialized JSON responses
+
+    Entries are keyed by collection version plus request parameters, so
+    bumping a collection's version on writes makes all of its cached
+    responses unreachable at once.
+    """
+
+    def __init__(self, max_size: int = 1024, ttl: float = 5.0):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries: "OrderedDict[tuple, CachedResponse]" = OrderedDict()
+        self._versions: Dict[str, int] = {}
+
+    @property
+    def enabled(self) -> bool:
+        return self.ttl > 0
+
+    def bump(self, collection: str):
+        """Invalidate every cached response built from a collection"""
+        self._versions[collection] = self._versions.get(collection, 0) + 1
+
+    def get(self, collection: str, key: Hashable) -> Optional[CachedResponse]:
+        """Return a fresh cached response, if any"""
+        if not self.enabled:
+            return None
+
+        full_key = (collection, self._versions.get(collection, 0), key)
+        entry = self._entries.get(full_key)
+        if entry is not None and entry.expires_at <= time.monotonic():
+            del self._entries[full_key]
+            entry = None
+
+        if entry is None:
+            record_cache_lookups(f"response_{collection}", hits=0, misses=1)
+            return None
+
+        record_cache_lookups(f"response_{collection}", hits=1, misses=0)
+        self._entries.move_to_end(full_key)
+        return entry
+
+    def set(self, collection: str, key: Hashable, body: bytes) -> CachedResponse:
+        """Store a serialized response and return it with its ETag"""
+        entry = CachedResponse(body=body, etag=make_etag(body), expires_at=time.monotonic() + self.ttl)
+        if not self.enabled:
+            return entry
+
+        full_key = (collection, self._versions.get(collection, 0), key)
+        self._entries[full_key] = entry
+        self._entries.move_to_end(full_key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+        return entry
+
+response_cache = ResponseCache(
+    max_size=int(os.getenv("RESPONSE_CACHE_SIZE", "1024")),
+    ttl=float(os.getenv("RESPONSE_CACHE_TTL_SECONDS", "5")),
+)
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Check an If-None-Match header against an ETag
+
+    Uses weak comparison, so W/ forms (sent by CompressionMiddleware for
+    compressed responses) match as well.
+    """
+    if not if_none_match:
+        return False
+    candidates = [candidate.strip().removeprefix("W/") for candidate in if_none_match.split(",")]
+    return "*" in candidates or etag.removeprefix("W/") in candidates
+
+def cached_json_response(cached: CachedResponse, if_none_match: Optional[str]) -> Response:
+    """Build a 200 JSON response, or 304 Not Modified when the client's copy is current"""
+    headers = {
+        "ETag": cached.etag,
+        "Cache-Control": f"public, max-age={max(0, int(response_cache.ttl))}",
+    }
+    if etag_matches(if_none_match, cached.etag):
+        return Response(status_code=304, headers=headers)
+    return Response(content=cached.body, media_type="application/json", headers=headers)
@@ -0,0 +1,56 @@
+import asyncio
+from typing import Awaitable, Callable, Dict, Hashable, Iterable, Optional, TypeVar
+
+T = TypeVar("T")
+
+class Abandoned(Exception):
+    """The caller running shared work was cancelled before it finished"""
+
+class SingleFlight:
+    """Work in flight, keyed so concurrent callers can share one run
+
+    The first caller runs the work under one or more keys; callers that
+    find a key in flight wait() for its result or exception instead. If
+    the running caller is cancelled, waiters get Abandoned rather than a
+    CancelledError of their own, and should run the work themselves.
+    """
+
+    def __init__(self):
+        self._flights: Dict[Hashable, asyncio.Future] = {}
+
+    def get(self, key: Hashable) -> Optional[asyncio.Future]:
+        """The flight running for key, if any"""
+        return self._flights.get(key)
+
+    async def run(self, keys: Iterable[Hashable], work: Callable[[], Awaitable[T]]) -> T:
+        """Await work(), publishing its outcome to callers waiting on keys"""
+        keys = list(keys)
+        future = asyncio.get_running_loop().create_future()
+        # Mark the exception as retrieved when nobody was waiting
+        future.add_done_callback(lambda f: f.exception())
+        for key in keys:
+            self._flights[key] = future
+
+        try:
+            result = await work()
+        except Exception as e:
+            future.set_exception(e)
+            raise
+        except BaseException:
+            future.set_exception(Abandoned())
+            raise
+        finally:
+            for key in keys:
+                if self._flights.get(key) is future:
+                    del self._flights[key]
+
+        future.set_result(result)
+        return result
+
+    @staticmethod
+    async def wait(flight: asyncio.Future) -> T:
+        """Outcome of another caller's run; Abandoned if it was cancelled
+
+        Shielded, so cancelling a waiter never cancels the shared flight.
+        """
+        return await asyncio.shield(flight)
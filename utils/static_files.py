@@ -0,0 +1,52 @@
+import mimetypes
+import os
+from starlette.datastructures import Headers
+from starlette.responses import FileResponse, Response
+from starlette.staticfiles import NotModifiedResponse, StaticFiles
+from starlette.types import Scope
+from utils.compression import PRECOMPRESSED_SUFFIXES, preferred_encodings, vary_on_accept_encoding
+
+class PrecompressedStaticFiles(StaticFiles):
+    """StaticFiles that serves .br/.gz siblings to clients accepting them
+
+    Every response carries cache_control along with the ETag and
+    Last-Modified headers FileResponse sets, and conditional requests get
+    a 304. A compressed copy older than its source is ignored.
+    """
+
+    def __init__(self, *args, cache_control: str = "no-cache", **kwargs):
+        super().__init__(*args, **kwargs)
+        self.cache_control = cache_control
+
+    def file_response(
+        self,
+        full_path,
+        stat_result: os.stat_result,
+        scope: Scope,
+        status_code: int = 200
+    ) -> Response:
+        request_headers = Headers(scope=scope)
+        response = None
+        for encoding in preferred_encodings(request_headers.get("accept-encoding", "")):
+            compressed_path = f"{full_path}{PRECOMPRESSED_SUFFIXES[encoding]}"
+            try:
+                compressed_stat = os.stat(compressed_path)
+            except OSError:
+                continue
+            if compressed_stat.st_mtime < stat_result.st_mtime:
+                continue
+            
+            # Typed as the original file, not as a .gz/.br download
+            media_type = mimetypes.guess_type(str(full_path))[0] or "text/plain"
+            response = FileResponse(compressed_path, status_code=status_code, stat_result=compressed_stat, media_type=media_type)
+            response.headers["Content-Encoding"] = encoding
+            break
+        
+        if response is None:
+            response = FileResponse(full_path, status_code=status_code, stat_result=stat_result)
+        response.headers["Cache-Control"] = self.cache_control
+        vary_on_accept_encoding(response.headers)
+        
+        if self.is_not_modified(response.headers, request_headers):
+            return NotModifiedResponse(response.headers)
+        return response